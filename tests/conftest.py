@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +39,20 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def test_caches():
+    # Кеш в памяти процесса, как у manage.py test (core.test_runner).
+    from django.test.utils import override_settings
+    from core.test_runner import TEST_CACHES
+    with override_settings(CACHES=TEST_CACHES):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(test_caches):
+    # Тест идёт в транзакции без коммита: версии кеша, которые сдвигаются
+    # после коммита, не меняются, и страницы прошлых тестов надо убрать.
+    from django.core.cache import cache
+    cache.clear()
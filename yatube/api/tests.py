@@ -0,0 +1,127 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from posts.tests.on_commit import run_on_commit
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group,
+            )
+            for number in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Комментарий',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PAGES=2)
+    def test_feeds_paginate_by_cursor(self):
+        """Ленты отдают компактные посты страницами по курсору."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', args=(self.group.slug,)),
+            reverse('api:profile', args=(self.author.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).json()
+                self.assertEqual(
+                    [post['id'] for post in first['results']],
+                    [self.posts[2].pk, self.posts[1].pk],
+                )
+                self.assertEqual(first['results'][0]['author'], 'Author')
+                second = self.client.get(
+                    url, {'cursor': first['next']},
+                ).json()
+                self.assertEqual(
+                    [post['id'] for post in second['results']],
+                    [self.posts[0].pk],
+                )
+                self.assertIsNone(second['next'])
+
+    def test_not_found(self):
+        """Неизвестные группа, автор и пост отдают JSON 404."""
+        urls = (
+            reverse('api:group_posts', args=('nope',)),
+            reverse('api:profile', args=('nobody',)),
+            reverse('api:post_detail', args=(999,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+
+    def test_post_detail_and_batch(self):
+        """Пост с комментариями и пакет постов одним запросом."""
+        post = self.client.get(
+            reverse('api:post_detail', args=(self.posts[0].pk,)),
+        ).json()
+        self.assertEqual(post['comments_count'], 1)
+        self.assertEqual(post['comments'][0]['text'], 'Комментарий')
+        ids = f'{self.posts[1].pk},999,{self.posts[0].pk}'
+        with self.assertNumQueries(1):
+            batch = self.client.get(
+                reverse('api:posts_batch'), {'ids': ids},
+            ).json()
+        self.assertEqual(
+            [post['id'] for post in batch['results']],
+            [self.posts[1].pk, self.posts[0].pk],
+        )
+        self.assertEqual(batch['missing'], [999])
+
+    @override_settings(API_BATCH_SIZE=2)
+    def test_batch_ids_parsing(self):
+        """Не-ASCII цифры и повторы отбрасываются, лишние id не читаются."""
+        url = reverse('api:posts_batch')
+        cases = (
+            ('²,١', []),
+            (f'{self.posts[0].pk},{self.posts[0].pk}', [self.posts[0].pk]),
+            (
+                f' {self.posts[0].pk},x,{self.posts[1].pk},{self.posts[2].pk}',
+                [self.posts[0].pk, self.posts[1].pk],
+            ),
+        )
+        for ids, expected in cases:
+            with self.subTest(ids=ids):
+                response = self.client.get(url, {'ids': ids})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(
+                    [post['id'] for post in response.json()['results']],
+                    expected,
+                )
+
+    def test_etag_revalidation(self):
+        """Неизменившаяся страница отдаётся как 304 без запросов к базе."""
+        url = reverse('api:post_detail', args=(self.posts[0].pk,))
+        etag = self.client.get(url)['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        with run_on_commit():
+            Comment.objects.create(
+                post=self.posts[0], author=self.author, text='Ещё один',
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
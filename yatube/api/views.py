@@ -0,0 +1,135 @@
+from http import HTTPStatus
+import re
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from posts.cache import (
+    dependency_etag, dependency_versions, versions_etag,
+)
+from posts.models import Comment, Group, Post, User
+from posts.utils import CursorPaginator
+
+# Поля поста в ответах API: только то, что нужно клиенту.
+POST_FIELDS = (
+    'pk', 'text', 'pub_date', 'author__username', 'group__slug', 'image',
+    'comments_count',
+)
+COMMENT_FIELDS = ('pk', 'author__username', 'text', 'created')
+# Id в ?ids=: только ASCII-цифры, str.isdigit пропускает и «²».
+POST_ID = re.compile(r'[0-9]+')
+
+
+def api_response(data, status=HTTPStatus.OK):
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def not_found():
+    return api_response({'detail': 'Не найдено'}, HTTPStatus.NOT_FOUND)
+
+
+def serialize_post(row):
+    """Компактное представление поста из строки values()."""
+    image = row['image']
+    return {
+        'id': row['pk'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': Post.image.field.storage.url(image) if image else None,
+        'comments_count': row['comments_count'],
+    }
+
+
+def feed_response(request, posts):
+    """Страница ленты по курсору из ?cursor=."""
+    page = CursorPaginator(
+        posts.values(*POST_FIELDS), settings.PAGES,
+    ).get_page(request.GET.get('cursor'))
+    return api_response({
+        'results': [serialize_post(row) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def batch_ids(request):
+    """Id постов из ?ids=1,2,3 без повторов, не больше API_BATCH_SIZE."""
+    ids = {}
+    for value in request.GET.get('ids', '').split(','):
+        if len(ids) == settings.API_BATCH_SIZE:
+            break
+        if POST_ID.fullmatch(value.strip()):
+            ids.setdefault(int(value), None)
+    return list(ids)
+
+
+def batch_etag(request):
+    return versions_etag(request, dependency_versions(
+        [f'post:{pk}' for pk in batch_ids(request)]
+    ))
+
+
+@require_safe
+@condition(etag_func=dependency_etag('feed'))
+def index(request):
+    """Лента всех постов."""
+    return feed_response(request, Post.objects.all())
+
+
+@require_safe
+@condition(etag_func=dependency_etag('group:{slug}'))
+def group_posts(request, slug):
+    """Лента постов группы."""
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return not_found()
+    return feed_response(request, group.posts.all())
+
+
+@require_safe
+@condition(etag_func=dependency_etag('author:{username}'))
+def profile(request, username):
+    """Лента постов автора."""
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return not_found()
+    return feed_response(request, author.posts.all())
+
+
+@require_safe
+@condition(etag_func=dependency_etag('post:{post_id}'))
+def post_detail(request, post_id):
+    """Пост с комментариями."""
+    row = Post.objects.filter(pk=post_id).values(*POST_FIELDS).first()
+    if row is None:
+        return not_found()
+    comments = Comment.objects.filter(post=post_id).values_list(
+        *COMMENT_FIELDS)
+    data = serialize_post(row)
+    data['comments'] = [
+        {'id': pk, 'author': author, 'text': text, 'created': created}
+        for pk, author, text, created in comments
+    ]
+    return api_response(data)
+
+
+@require_safe
+@condition(etag_func=batch_etag)
+def posts_batch(request):
+    """Несколько постов по id одним запросом, в порядке из ?ids=."""
+    ids = batch_ids(request)
+    rows = {
+        row['pk']: row
+        for row in Post.objects.filter(pk__in=ids).values(*POST_FIELDS)
+    }
+    return api_response({
+        'results': [serialize_post(rows[pk]) for pk in ids if pk in rows],
+        'missing': [pk for pk in ids if pk not in rows],
+    })
@@ -0,0 +1,278 @@
+from contextlib import contextmanager
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' size INTEGER NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    # Общий размер значений ведут триггеры, чтобы не считать SUM(size).
+    'CREATE TABLE IF NOT EXISTS cache_size (bytes INTEGER NOT NULL)',
+    'INSERT INTO cache_size SELECT 0 WHERE NOT EXISTS '
+    '(SELECT 1 FROM cache_size)',
+    'CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN'
+    ' UPDATE cache_size SET bytes = bytes + new.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN'
+    ' UPDATE cache_size SET bytes = bytes - old.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache'
+    ' BEGIN UPDATE cache_size SET bytes = bytes - old.size + new.size; END',
+)
+# SQLite ограничивает число параметров запроса.
+MAX_VARIABLES = 500
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite, общий для всех процессов на машине.
+
+    Файл работает в режиме WAL: читатели не ждут писателя. Целые числа
+    хранятся как есть, поэтому incr атомарен внутри BEGIN IMMEDIATE.
+    Когда значения занимают больше OPTIONS['MAX_BYTES'], удаляются
+    просроченные и давно не читанные записи, пока размер не опустится
+    до CULL_RATIO от границы.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = os.path.abspath(location)
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._cull_ratio = float(options.get('CULL_RATIO', 0.8))
+        self._busy_timeout = int(options.get('BUSY_TIMEOUT', 5000))
+        # Время чтения обновляется не чаще, чем раз в ACCESS_RESOLUTION
+        # секунд, чтобы чтения почти не писали в файл.
+        self._access_resolution = float(options.get('ACCESS_RESOLUTION', 1))
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        """Соединение потока; после fork открывается заново."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout / 1000,
+                isolation_level=None, check_same_thread=False,
+            )
+            connection.execute(f'PRAGMA busy_timeout = {self._busy_timeout}')
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            with self._transaction(connection):
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    @staticmethod
+    @contextmanager
+    def _transaction(connection):
+        """Пишущая транзакция: блокировка берётся сразу, без апгрейда."""
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    @staticmethod
+    def _size(value):
+        return len(value) if isinstance(value, bytes) else 8
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _fetch(self, keys):
+        """Непросроченные значения по ключам кеша, с отметкой чтения."""
+        now = time.time()
+        found = {}
+        connection = self._connection
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            marks = ','.join('?' * len(chunk))
+            rows = connection.execute(
+                f'SELECT key, value, accessed FROM cache WHERE key IN '
+                f'({marks}) AND (expires IS NULL OR expires > ?)',
+                (*chunk, now),
+            ).fetchall()
+            stale = [
+                key for key, _, accessed in rows
+                if accessed < now - self._access_resolution
+            ]
+            if stale:
+                connection.execute(
+                    f'UPDATE cache SET accessed = ? WHERE key IN '
+                    f'({",".join("?" * len(stale))})',
+                    (now, *stale),
+                )
+            found.update((key, value) for key, value, _ in rows)
+        return found
+
+    def _store(self, connection, items, timeout):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        # UPSERT, а не REPLACE: REPLACE не вызывает триггер удаления.
+        connection.executemany(
+            'INSERT INTO cache (key, value, size, expires, accessed)'
+            ' VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET'
+            ' value = excluded.value, size = excluded.size,'
+            ' expires = excluded.expires, accessed = excluded.accessed',
+            [
+                (key, value, self._size(value), expires, now)
+                for key, value in items
+            ],
+        )
+
+    @staticmethod
+    def _delete(connection, keys):
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            connection.execute(
+                f'DELETE FROM cache WHERE key IN '
+                f'({",".join("?" * len(chunk))})',
+                chunk,
+            )
+
+    def _cull(self, connection):
+        """Удаляет просроченное, затем давно не читанное сверх бюджета."""
+        size, = connection.execute('SELECT bytes FROM cache_size').fetchone()
+        if size <= self._max_bytes:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),),
+        )
+        size, = connection.execute('SELECT bytes FROM cache_size').fetchone()
+        excess = size - self._max_bytes * self._cull_ratio
+        oldest = []
+        for key, entry_size in connection.execute(
+            'SELECT key, size FROM cache ORDER BY accessed',
+        ):
+            if excess <= 0:
+                break
+            oldest.append(key)
+            excess -= entry_size
+        self._delete(connection, oldest)
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        found = self._fetch([key])
+        if key not in found:
+            return default
+        return self._decode(found[key])
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        return {
+            names[key]: self._decode(value)
+            for key, value in self._fetch(list(names)).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction(self._connection) as connection:
+            self._store(connection, [(key, self._encode(value))], timeout)
+            self._cull(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [
+            (self._key(key, version), self._encode(value))
+            for key, value in data.items()
+        ]
+        with self._transaction(self._connection) as connection:
+            self._store(connection, items, timeout)
+            self._cull(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction(self._connection) as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            if connection.execute(
+                'SELECT 1 FROM cache WHERE key = ?', (key,),
+            ).fetchone():
+                return False
+            self._store(connection, [(key, self._encode(value))], timeout)
+            self._cull(connection)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction(self._connection) as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._decode(row[0]) + delta
+            encoded = self._encode(value)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?',
+                (encoded, self._size(encoded), time.time(), key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction(self._connection) as connection:
+            return connection.execute(
+                'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now),
+            ).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._transaction(self._connection) as connection:
+            self._delete(connection, keys)
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время процесса, как у LocMemCache.
+        pass
@@ -0,0 +1,52 @@
+from functools import wraps
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению SQLite.
+
+    Реплики не переводятся в WAL: replicate подменяет их файл целиком,
+    и журнал рядом с ним остался бы от старой копии.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    replica = connection.alias in settings.DATABASE_REPLICAS
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            if replica and pragma == 'journal_mode':
+                continue
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+def is_locked(error):
+    return 'locked' in str(error)
+
+
+def retry_on_locked(view):
+    """Повторяет изменяющий view, если SQLite занята другим писателем.
+
+    Каждая попытка идёт в своей транзакции, поэтому неудачная
+    откатывается целиком. Пауза растёт вдвое с каждой попыткой,
+    попыток не больше DATABASE_LOCK_ATTEMPTS.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        delay = settings.DATABASE_LOCK_DELAY
+        attempts = max(1, settings.DATABASE_LOCK_ATTEMPTS)
+        for attempt in range(attempts):
+            try:
+                with transaction.atomic():
+                    return view(request, *args, **kwargs)
+            except OperationalError as error:
+                if not is_locked(error) or attempt == attempts - 1:
+                    raise
+            # Загрузки перечитываются следующей попыткой с начала.
+            for upload in request.FILES.values():
+                upload.seek(0)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
+    return wrapper
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+# Полнотекстовые индексы постов и комментариев (posts, миграции 0017-0018).
+SEARCH_TABLES = ('posts_post_search', 'posts_comment_search')
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание SQLite: PRAGMA optimize или полный ANALYZE, '
+        'слияние сегментов поиска и сброс WAL. Запускать по расписанию, '
+        'например раз в сутки из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Алиас базы (по умолчанию default).',
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Пересчитать статистику всех индексов (ANALYZE).',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда обслуживает только SQLite')
+        with connection.cursor() as cursor:
+            if options['analyze']:
+                cursor.execute('ANALYZE')
+                self.stdout.write('Статистика пересчитана')
+            else:
+                # Пересчитывает статистику только там, где она устарела.
+                cursor.execute('PRAGMA optimize')
+                self.stdout.write('PRAGMA optimize выполнена')
+            tables = connection.introspection.table_names(cursor)
+            for table in SEARCH_TABLES:
+                if table in tables:
+                    cursor.execute(
+                        f"INSERT INTO {table}({table}) VALUES ('optimize')"
+                    )
+                    self.stdout.write(f'Индекс поиска {table} сжат')
+            cursor.execute('PRAGMA journal_mode')
+            if cursor.fetchone()[0] == 'wal':
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                self.stdout.write('Журнал WAL сброшен в базу')
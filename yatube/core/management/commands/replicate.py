@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def copy_database(source, target):
+    """Копирует SQLite-базу целиком и атомарно подменяет файл реплики.
+
+    Копия снимается backup API, поэтому запись в источник не мешает.
+    Читатели реплики видят либо старый файл, либо новый целиком.
+    """
+    temporary = f'{target}.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(temporary)
+    try:
+        source_connection.backup(target_connection)
+        # У реплики не должно быть своего журнала WAL рядом с файлом.
+        target_connection.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        target_connection.close()
+        source_connection.close()
+    os.replace(temporary, target)
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет реплики SQLite копией основной базы: замена '
+        'настоящей репликации для запуска на одной машине.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            action='append',
+            dest='aliases',
+            default=[],
+            help='Обновить только эту реплику.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Повторять каждые N секунд (0 - один раз).',
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('Реплики не настроены (YATUBE_DB_REPLICAS)')
+        unknown = set(aliases) - set(settings.DATABASE_REPLICAS)
+        if unknown:
+            raise CommandError(f'Нет реплик: {", ".join(sorted(unknown))}')
+        source = connections['default'].settings_dict['NAME']
+        while True:
+            for alias in aliases:
+                copy_database(source, connections[alias].settings_dict['NAME'])
+                connections[alias].close()
+                self.stdout.write(f'Реплика {alias} обновлена')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
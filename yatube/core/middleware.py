@@ -0,0 +1,34 @@
+from django.conf import settings
+
+from .routers import has_written, replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaPinMiddleware:
+    """Направляет чтение безопасных запросов на реплики.
+
+    После изменяющего запроса или любого запроса, записавшего в базу
+    (подписка идёт по GET), пользователь получает cookie на
+    REPLICA_PIN_SECONDS: пока она жива, его запросы читают из default
+    и видят свою запись, даже если реплика ещё не догнала.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        writes = request.method not in SAFE_METHODS
+        with replica_reads(not (pinned or writes)):
+            response = self.get_response(request)
+            wrote = has_written()
+        if writes or wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+import random
+import threading
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def using_replica():
+    """Читает ли текущий поток с реплик.
+
+    После первой записи поток читает из default: иначе он мог бы не
+    увидеть только что записанное.
+    """
+    return (
+        getattr(_state, 'replica', False)
+        and not has_written()
+        and bool(settings.DATABASE_REPLICAS)
+    )
+
+
+def has_written():
+    """Писал ли текущий поток в базу с начала блока replica_reads()."""
+    return getattr(_state, 'wrote', False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Включает чтение с реплик в текущем потоке на время блока.
+
+    Записи считаются с начала блока: после первой из них чтение
+    снова идёт из default.
+    """
+    previous, wrote = getattr(_state, 'replica', False), has_written()
+    _state.replica, _state.wrote = enabled, False
+    try:
+        yield
+    finally:
+        _state.replica, _state.wrote = previous, wrote or has_written()
+
+
+class ReplicaRouter:
+    """Запись и миграции - в default, чтение - с реплик.
+
+    С реплик читается только внутри replica_reads(): его включает
+    ReplicaPinMiddleware для безопасных запросов без метки записи.
+    Команды, сигналы после записи и тесты читают из default. Каждая
+    запись отмечается, чтобы закрепить чтение пользователя за default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if using_replica():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными (см. replicate).
+        return db == 'default'
@@ -1,6 +1,27 @@
 from http import HTTPStatus
+from io import StringIO
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+
+from .cache import SQLiteCache
+from .db import retry_on_locked
+from .management.commands.replicate import copy_database
+from .middleware import ReplicaPinMiddleware
+from .routers import ReplicaRouter, replica_reads
 
 
 class ViewTestClass(TestCase):
@@ -9,3 +30,222 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_values(self):
+        """Значения, пакеты, add и delete работают как у других кешей."""
+        self.cache.set('text', {'a': [1, 2]})
+        self.cache.set_many({'one': 1, 'flag': True})
+        self.assertEqual(self.cache.get('text'), {'a': [1, 2]})
+        self.assertEqual(
+            self.cache.get_many(['one', 'flag', 'missing']),
+            {'one': 1, 'flag': True},
+        )
+        self.assertFalse(self.cache.add('one', 2))
+        self.assertTrue(self.cache.add('two', 2))
+        self.cache.delete_many(['one', 'two'])
+        self.assertIsNone(self.cache.get('one'))
+        self.assertEqual(self.cache.get('two', 'default'), 'default')
+
+    def test_shared_between_connections(self):
+        """Запись одного процесса сразу видна другим."""
+        self.cache.set('feed', 1)
+        other = self.make_cache()
+        self.assertEqual(other.incr('feed'), 2)
+        self.assertEqual(self.cache.get('feed'), 2)
+
+    def test_incr_is_atomic(self):
+        """Параллельные incr из разных соединений не теряются."""
+        self.cache.set('counter', 0)
+
+        def increment():
+            cache = self.make_cache()
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_timeout(self):
+        """Просроченные записи не читаются и могут быть добавлены снова."""
+        now = time.time()
+        self.cache.set('short', 'value', timeout=10)
+        self.cache.set('forever', 'value', timeout=None)
+        with mock.patch('core.cache.time.time', return_value=now + 20):
+            self.assertIsNone(self.cache.get('short'))
+            self.assertEqual(self.cache.get('forever'), 'value')
+            self.assertFalse(self.cache.has_key('short'))
+            self.assertTrue(self.cache.add('short', 'new'))
+
+    def test_lru_eviction(self):
+        """Сверх бюджета вытесняются давно не читанные записи."""
+        cache = self.make_cache(MAX_BYTES=20_000, ACCESS_RESOLUTION=0)
+        value = 'x' * 1000
+        for number in range(15):
+            cache.set(f'key{number}', value)
+        cache.get('key0')
+        for number in range(15, 25):
+            cache.set(f'key{number}', value)
+        self.assertEqual(cache.get('key0'), value)
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.get('key24'), value)
+        size, = cache._connection.execute(
+            'SELECT bytes FROM cache_size').fetchone()
+        self.assertLessEqual(size, 20_000)
+        cache.clear()
+        size, = cache._connection.execute(
+            'SELECT bytes FROM cache_size').fetchone()
+        self.assertEqual(size, 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def read_alias(self, request):
+        """Куда уйдёт чтение во время обработки запроса."""
+        aliases = []
+
+        def get_response(request):
+            aliases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(get_response)(request)
+        return aliases[0], response
+
+    def test_default_outside_requests(self):
+        """Вне запросов чтение и запись идут в default."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'replica1')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+
+    def test_reads_pinned_after_write(self):
+        """После записи чтение пользователя закреплено за default."""
+        factory = RequestFactory()
+        alias, _ = self.read_alias(factory.get('/'))
+        self.assertEqual(alias, 'replica1')
+        alias, response = self.read_alias(factory.post('/'))
+        self.assertEqual(alias, 'default')
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        request = factory.get('/')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = cookie.value
+        alias, _ = self.read_alias(request)
+        self.assertEqual(alias, 'default')
+
+    def test_reads_pinned_after_write_on_get(self):
+        """Запись в безопасном запросе переводит чтение на default."""
+        aliases = []
+
+        def get_response(request):
+            aliases.append(self.router.db_for_read(Post))
+            self.router.db_for_write(Post)
+            aliases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(get_response)(
+            RequestFactory().get('/'),
+        )
+        self.assertEqual(aliases, ['replica1', 'default'])
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        alias, response = self.read_alias(RequestFactory().get('/'))
+        self.assertEqual(alias, 'replica1')
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_follow_over_get_pins_reads(self):
+        """Подписка по GET ставит cookie чтения из default."""
+        reader = User.objects.create(username='Reader')
+        author = User.objects.create(username='Author')
+        self.client.force_login(reader)
+        response = self.client.get(
+            reverse('posts:profile_follow', args=(author.username,)),
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertTrue(Follow.objects.filter(
+            user=reader, author=author,
+        ).exists())
+
+    def test_copy_database(self):
+        """replicate подменяет файл реплики полной копией базы."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        source = os.path.join(directory, 'primary.sqlite3')
+        target = os.path.join(directory, 'replica.sqlite3')
+        with sqlite3.connect(source) as connection:
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('CREATE TABLE posts (text TEXT)')
+            connection.execute("INSERT INTO posts VALUES ('первый')")
+        copy_database(source, target)
+        with sqlite3.connect(target) as connection:
+            self.assertEqual(
+                connection.execute('SELECT text FROM posts').fetchall(),
+                [('первый',)],
+            )
+
+
+class DatabaseProfileTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        """Каждое новое соединение SQLite получает SQLITE_PRAGMAS."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        alias = 'pragmas'
+        connections.databases[alias] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(directory, 'db.sqlite3'),
+        }
+        self.addCleanup(connections.databases.pop, alias)
+        pragmas = {'journal_mode': 'WAL', 'busy_timeout': 1234}
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            connection = connections[alias]
+            self.addCleanup(connection.close)
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 1234)
+
+    @override_settings(DATABASE_LOCK_ATTEMPTS=3, DATABASE_LOCK_DELAY=0)
+    def test_retry_on_locked(self):
+        """Запись повторяется при занятой базе, но не бесконечно."""
+        calls = []
+
+        @retry_on_locked
+        def view(request, failures):
+            calls.append(request)
+            if len(calls) <= failures:
+                raise OperationalError('database is locked')
+            return HttpResponse()
+
+        request = RequestFactory().post('/')
+        self.assertEqual(view(request, 2).status_code, 200)
+        self.assertEqual(len(calls), 3)
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            view(request, 3)
+        self.assertEqual(len(calls), 3)
+
+    def test_optimize_db(self):
+        """optimize_db обслуживает базу и индекс поиска."""
+        out = StringIO()
+        call_command('optimize_db', '--analyze', stdout=out)
+        self.assertIn('Статистика пересчитана', out.getvalue())
@@ -1,9 +1,54 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
 
-from .models import Post, Group
+from . import feed, media
+from .cache import bump, post_dependencies
+from .counters import reconcile_groups, reconcile_posts, reconcile_users
+from .models import Comment, FeedItem, Follow, Group, Post
+from .search import search_posts
+from .utils import CachedCountPaginator, batched
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список для больших таблиц: без полного COUNT(*) и тяжёлых виджетов.
+
+    Число строк считает CachedCountPaginator: с кешем и границей
+    PAGINATOR_COUNT_LIMIT. Общий итог при фильтрации не считается вовсе.
+    """
+
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_actions(self, request):
+        # Стандартное удаление загружает каждый объект ради сигналов,
+        # вместо него у каждой модели своё действие delete_fast.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+
+def _delete_in_one_statement(queryset):
+    """Удаляет выборку одним DELETE, без сигналов и загрузки объектов."""
+    return queryset.order_by()._raw_delete(queryset.db)
+
+
+def _affected_posts(post_ids):
+    """Посты с полями, нужными для post_dependencies."""
+    return list(Post.objects.filter(pk__in=post_ids).select_related(
+        'author', 'group',
+    ).only('pk', 'author__username', 'group__slug'))
+
+
+def _bump_posts(posts):
+    bump(*{
+        dependency
+        for post in posts
+        for dependency in post_dependencies(post)
+    })
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -11,11 +56,133 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    actions = ('remove_from_group', 'delete_fast')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('image_placeholder')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE по всем постам."""
+        if not search_term:
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
+    def remove_from_group(self, request, queryset):
+        """Убирает посты из групп одним UPDATE."""
+        posts = _affected_posts(
+            queryset.filter(group__isnull=False).order_by().values('pk'),
+        )
+        updated = Post.objects.filter(
+            pk__in=[post.pk for post in posts],
+        ).update(group=None)
+        for batch in batched({post.group_id for post in posts}, 500):
+            reconcile_groups(batch)
+        _bump_posts(posts)
+        self.message_user(
+            request, f'Убрано из групп постов: {updated}', messages.SUCCESS,
+        )
+    remove_from_group.short_description = 'Убрать из группы'
+
+    def delete_fast(self, request, queryset):
+        """Удаляет посты пачками DELETE и делает работу их сигналов.
+
+        Вместе с постами удаляются комментарии и записи лент, снимаются
+        ссылки на картинки, сверяются счётчики авторов и групп.
+        """
+        posts = list(Post.objects.filter(
+            pk__in=queryset.order_by().values('pk'),
+        ).select_related('author', 'group').only(
+            'pk', 'image', 'author_id', 'group_id',
+            'author__username', 'group__slug',
+        ))
+        deleted = 0
+        with transaction.atomic():
+            for batch in batched([post.pk for post in posts], 500):
+                _delete_in_one_statement(
+                    Comment.objects.filter(post__in=batch),
+                )
+                _delete_in_one_statement(
+                    FeedItem.objects.filter(post__in=batch),
+                )
+                deleted += _delete_in_one_statement(
+                    Post.objects.filter(pk__in=batch),
+                )
+            for post in posts:
+                media.release(post.image.name)
+            for batch in batched({post.author_id for post in posts}, 500):
+                reconcile_users(batch)
+            group_ids = {post.group_id for post in posts} - {None}
+            for batch in batched(group_ids, 500):
+                reconcile_groups(batch)
+        _bump_posts(posts)
+        self.message_user(
+            request, f'Удалено постов: {deleted}', messages.SUCCESS,
+        )
+    delete_fast.short_description = 'Удалить выбранные посты'
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'posts_count')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('pk', 'text', 'post', 'author', 'created')
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    search_fields = ('=author__username',)
+    date_hierarchy = 'created'
+    actions = ('delete_fast',)
+
+    def delete_fast(self, request, queryset):
+        """Удаляет комментарии одним DELETE и сверяет счётчики постов."""
+        posts = _affected_posts(queryset.order_by().values('post_id'))
+        deleted = _delete_in_one_statement(queryset)
+        for batch in batched([post.pk for post in posts], 500):
+            reconcile_posts(batch)
+        _bump_posts(posts)
+        self.message_user(
+            request, f'Удалено комментариев: {deleted}', messages.SUCCESS,
+        )
+    delete_fast.short_description = 'Удалить выбранные комментарии'
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    actions = ('delete_fast',)
+
+    def delete_fast(self, request, queryset):
+        """Удаляет подписки одним DELETE, затем чистит ленты и счётчики."""
+        pairs = list(queryset.order_by().values_list(
+            'user_id', 'author_id', 'user__username', 'author__username',
+        ))
+        deleted = _delete_in_one_statement(queryset)
+        for user_id, author_id, _, _ in pairs:
+            feed.purge_follow(Follow(user_id=user_id, author_id=author_id))
+        user_ids = {user_id for pair in pairs for user_id in pair[:2]}
+        for batch in batched(user_ids, 500):
+            reconcile_users(batch)
+        bump(*{
+            f'author:{username}'
+            for pair in pairs for username in pair[2:]
+        })
+        self.message_user(
+            request, f'Удалено подписок: {deleted}', messages.SUCCESS,
+        )
+    delete_fast.short_description = 'Удалить выбранные подписки'
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,170 @@
+from functools import partial, wraps
+from hashlib import md5
+from http import HTTPStatus
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.routers import using_replica
+
+from .fragments import fill_fragments
+from .models import Group
+
+
+def version_key(dependency):
+    """Ключ версии зависимости, безопасный для любого бэкенда кеша."""
+    return 'deps:' + md5(dependency.encode()).hexdigest()
+
+
+def _initial_version():
+    """Начальная версия зависимости.
+
+    Берётся из времени, чтобы вытесненная из кеша версия не вернулась
+    к уже использованному значению и не подняла старые страницы.
+    """
+    return int(time.time() * 1000)
+
+
+def dependency_versions(dependencies):
+    """Текущие версии зависимостей одним чтением из кеша."""
+    keys = [version_key(dependency) for dependency in dependencies]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _initial_version(), None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key) for key in keys]
+
+
+def bump(*dependencies):
+    """Сдвигает версии зависимостей после коммита текущей транзакции.
+
+    Раньше коммита нельзя: читатель взял бы новую версию, прочёл старые
+    данные и сохранил устаревшую страницу под новым ключом.
+    """
+    transaction.on_commit(partial(_bump_now, dependencies))
+
+
+def _bump_now(dependencies):
+    for dependency in dependencies:
+        key = version_key(dependency)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+
+
+def post_dependencies(post, old_group_id=None):
+    """Зависимости страниц, на которых показывается пост."""
+    dependencies = [
+        'feed',
+        f'post:{post.pk}',
+        f'author:{post.author.username}',
+    ]
+    if old_group_id is not None and old_group_id != post.group_id:
+        slugs = Group.objects.filter(
+            pk__in=(old_group_id, post.group_id),
+        ).values_list('slug', flat=True)
+        dependencies.extend(f'group:{slug}' for slug in slugs)
+    elif post.group_id is not None:
+        dependencies.append(f'group:{post.group.slug}')
+    return dependencies
+
+
+def follow_dependencies(follow):
+    """Профили, которые меняет подписка: счётчики автора и подписчика."""
+    return [
+        f'author:{follow.author.username}',
+        f'author:{follow.user.username}',
+    ]
+
+
+def versions_etag(request, versions, per_user=False):
+    """Сильный ETag: адрес запроса, версии зависимостей и пользователь.
+
+    Для личных страниц в ETag входит и CSRF-cookie: форма в ответе 304
+    должна нести токен, подходящий к текущему cookie. Страница с реплики
+    ETag не получает: версии уже новые, а реплика может отставать, и
+    устаревшее тело подтверждалось бы 304 до следующей записи.
+    """
+    if using_replica():
+        return None
+    parts = [request.get_full_path(), *versions]
+    if per_user:
+        parts += [
+            request.user.pk,
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+        ]
+    return md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def dependency_etag(*dependencies, per_user=False):
+    """etag_func для condition() по шаблонам зависимостей страницы.
+
+    Версии читаются из кеша одним запросом, поэтому ответ 304
+    отдаётся без запросов к базе и без рендеринга.
+    """
+    def etag_func(request, *args, **kwargs):
+        versions = dependency_versions(
+            [dependency.format(**kwargs) for dependency in dependencies]
+        )
+        return versions_etag(request, versions, per_user)
+    return etag_func
+
+
+def page_cache_key(request, versions):
+    """Ключ страницы: адрес и версии её зависимостей, без пользователя."""
+    signature = '|'.join(map(str, (request.get_full_path(), *versions)))
+    return 'page:' + md5(signature.encode()).hexdigest()
+
+
+def page_timeout(timeout=None):
+    """Срок страницы в кеше.
+
+    Страница, собранная по отстающей реплике, могла не увидеть запись,
+    уже сдвинувшую версии, поэтому живёт не дольше отставания реплик.
+    """
+    timeout = timeout or settings.PAGE_CACHE_TIMEOUT
+    if using_replica():
+        return min(timeout, settings.REPLICA_PIN_SECONDS)
+    return timeout
+
+
+def cache_page_with_deps(*dependencies, timeout=None):
+    """Кеширует страницу до изменения любой из её зависимостей.
+
+    Зависимости задаются шаблонами вида 'group:{slug}', которые
+    заполняются аргументами view. Тело страницы общее для всех
+    пользователей: вместо их фрагментов в нём метки, которые
+    заполняются при каждом ответе.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            versions = dependency_versions(
+                [dependency.format(**kwargs) for dependency in dependencies]
+            )
+            key = page_cache_key(request, versions)
+            response = cache.get(key)
+            if response is None:
+                # Метки вместо фрагментов только в ответе самого view:
+                # страницу ошибки обработчик рендерит уже без них.
+                request.shared_page = True
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    request.shared_page = False
+                if response.status_code == HTTPStatus.OK:
+                    cache.set(key, response, page_timeout(timeout))
+            if not response.streaming:
+                response.content = fill_fragments(
+                    request, response.content.decode(response.charset),
+                )
+            return response
+        return wrapper
+    return decorator
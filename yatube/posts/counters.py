@@ -0,0 +1,99 @@
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Follow, Group, Post, UserStats
+
+
+def _deltas(**deltas):
+    """Выражения F() для атомарного сдвига счётчиков без ухода в минус."""
+    return {
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    }
+
+
+def change_user_stats(user_id, **deltas):
+    """Сдвигает счётчики пользователя, при росте создаёт строку счётчиков.
+
+    При уменьшении строка не создаётся: пользователь может удаляться
+    вместе со своими постами и подписками.
+    """
+    if any(delta > 0 for delta in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id)
+    UserStats.objects.filter(user_id=user_id).update(**_deltas(**deltas))
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            **_deltas(posts_count=delta)
+        )
+
+
+def change_post_comments(post_id, delta):
+    if post_id is not None:
+        Post.objects.filter(pk=post_id).update(
+            **_deltas(comments_count=delta)
+        )
+
+
+def _counts(queryset, field):
+    """Словарь значение field -> число строк одним запросом GROUP BY."""
+    return dict(
+        queryset.order_by().values_list(field).annotate(total=Count('pk'))
+    )
+
+
+def reconcile_users(user_ids):
+    """Пересчитывает счётчики пользователей, возвращает число исправленных."""
+    posts = _counts(Post.objects.filter(author__in=user_ids), 'author')
+    followers = _counts(Follow.objects.filter(author__in=user_ids), 'author')
+    following = _counts(Follow.objects.filter(user__in=user_ids), 'user')
+    existing = UserStats.objects.in_bulk(user_ids)
+    drifted, missing = [], []
+    for user_id in user_ids:
+        values = {
+            'posts_count': posts.get(user_id, 0),
+            'followers_count': followers.get(user_id, 0),
+            'following_count': following.get(user_id, 0),
+        }
+        stats = existing.get(user_id)
+        if stats is None:
+            missing.append(UserStats(user_id=user_id, **values))
+            continue
+        if any(getattr(stats, field) != value
+               for field, value in values.items()):
+            for field, value in values.items():
+                setattr(stats, field, value)
+            drifted.append(stats)
+    UserStats.objects.bulk_create(missing, ignore_conflicts=True)
+    UserStats.objects.bulk_update(
+        drifted, ['posts_count', 'followers_count', 'following_count'],
+    )
+    return len(drifted) + len(missing)
+
+
+def _reconcile(queryset, field, related):
+    """Сверяет счётчик field с COUNT(related), возвращает число правок."""
+    drifted = []
+    rows = queryset.annotate(total=Count(related)).only(field)
+    for row in rows:
+        if getattr(row, field) != row.total:
+            setattr(row, field, row.total)
+            drifted.append(row)
+    queryset.model.objects.bulk_update(drifted, [field])
+    return len(drifted)
+
+
+def reconcile_groups(group_ids):
+    """Пересчитывает число постов групп."""
+    return _reconcile(
+        Group.objects.filter(pk__in=group_ids), 'posts_count', 'posts',
+    )
+
+
+def reconcile_posts(post_ids):
+    """Пересчитывает число комментариев постов."""
+    return _reconcile(
+        Post.objects.filter(pk__in=post_ids), 'comments_count', 'comments',
+    )
@@ -0,0 +1,100 @@
+import csv
+import json
+import zlib
+
+from django.conf import settings
+
+from .models import Comment
+
+# Колонки CSV: общий набор для постов и комментариев, как у import_posts.
+CSV_FIELDS = (
+    'type', 'id', 'post', 'author', 'group', 'text', 'pub_date', 'created',
+    'image',
+)
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: write возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_records(posts):
+    """Записи постов, затем их комментариев, в формате import_posts.
+
+    Оба запроса читаются через iterator(chunk_size), поэтому в памяти
+    одновременно лежит не больше EXPORT_CHUNK_SIZE строк.
+    """
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    rows = posts.order_by('pk').values_list(
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date', 'image',
+    )
+    for pk, author, group, text, pub_date, image in rows.iterator(
+        chunk_size=chunk_size,
+    ):
+        yield {
+            'type': 'post',
+            'id': pk,
+            'author': author,
+            'group': group or '',
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'image': image,
+        }
+    comments = Comment.objects.filter(
+        post__in=posts.order_by().values('pk'),
+    ).order_by('pk').values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created',
+    )
+    for pk, post_id, author, text, created in comments.iterator(
+        chunk_size=chunk_size,
+    ):
+        yield {
+            'type': 'comment',
+            'id': pk,
+            'post': post_id,
+            'author': author,
+            'text': text,
+            'created': created.isoformat(),
+        }
+
+
+def encode_lines(records, file_format):
+    """Строки файла выгрузки: JSON Lines или CSV с заголовком."""
+    if file_format == 'csv':
+        writer = csv.DictWriter(Echo(), CSV_FIELDS)
+        yield writer.writerow(dict(zip(CSV_FIELDS, CSV_FIELDS)))
+        for record in records:
+            yield writer.writerow(record)
+        return
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def export_stream(posts, file_format='jsonl', compress=True):
+    """Выгрузка постов потоком байтов, по желанию в gzip.
+
+    Строки собираются в куски по EXPORT_BUFFER_SIZE байт, чтобы
+    не отдавать и не сжимать их по одной.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer, size = [], 0
+    for line in encode_lines(export_records(posts), file_format):
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size < settings.EXPORT_BUFFER_SIZE:
+            continue
+        chunk = b''.join(buffer)
+        buffer, size = [], 0
+        if compressor is not None:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+    chunk = b''.join(buffer)
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import Feed, FeedItem, Post
+from .utils import batched
+
+
+def _insert_items(user_ids, posts):
+    """Пакетно вставляет пары (подписчик, пост) в ленты."""
+    items = [
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id in user_ids
+        for post_id, pub_date in posts
+    ]
+    FeedItem.objects.bulk_create(
+        items,
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по собранным лентам подписчиков автора."""
+    followers = Feed.objects.filter(
+        user__follower__author=post.author_id,
+    ).values_list('user_id', flat=True)
+    for user_ids in batched(followers.iterator(), settings.FEED_BATCH_SIZE):
+        _insert_items(user_ids, [(post.pk, post.pub_date)])
+
+
+def backfill_follow(follow):
+    """Добавляет в ленту подписчика все посты нового автора."""
+    if not Feed.objects.filter(user=follow.user_id).exists():
+        return
+    posts = Post.objects.filter(
+        author=follow.author_id,
+    ).values_list('pk', 'pub_date')
+    for batch in batched(posts.iterator(), settings.FEED_BATCH_SIZE):
+        _insert_items([follow.user_id], batch)
+
+
+def purge_follow(follow):
+    """Убирает из ленты подписчика посты автора, от которого он отписался."""
+    FeedItem.objects.filter(
+        user=follow.user_id,
+        post__author=follow.author_id,
+    ).delete()
+
+
+def build_feed(user_id, batch_size=None):
+    """Собирает ленту подписчика заново из текущих подписок."""
+    batch_size = batch_size or settings.FEED_BATCH_SIZE
+    posts = Post.objects.filter(
+        author__following__user=user_id,
+    ).values_list('pk', 'pub_date')
+    with transaction.atomic():
+        FeedItem.objects.filter(user=user_id).delete()
+        for batch in batched(posts.iterator(), batch_size):
+            _insert_items([user_id], batch)
+        Feed.objects.update_or_create(user_id=user_id)
+
+
+def follow_posts(user):
+    """Посты авторов, на которых подписан пользователь.
+
+    Если лента пользователя уже собрана, посты читаются из неё одним
+    диапазоном по индексу, иначе используется соединение через Follow.
+    """
+    if (
+        settings.FOLLOW_FEED_INBOX
+        and Feed.objects.filter(user=user).exists()
+    ):
+        # Ключ ленты берётся из той же строки feed_items, что и фильтр:
+        # курсор CursorPaginator продолжает диапазон по её индексу.
+        return Post.objects.filter(feed_items__user=user).annotate(
+            feed_date=F('feed_items__pub_date'),
+            feed_post=F('feed_items__post_id'),
+        ).order_by('-feed_date', '-feed_post')
+    return Post.objects.filter(author__following__user=user)
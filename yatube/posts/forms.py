@@ -1,6 +1,8 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
 from .models import Post, Comment
+from .uploads import normalize_image
 
 
 class PostForm(ModelForm):
@@ -8,6 +10,13 @@ class PostForm(ModelForm):
         model = Post
         fields = ["text", "group", "image"]
 
+    def clean_image(self):
+        """Новая картинка проверяется и уменьшается до сохранения."""
+        image = self.cleaned_data["image"]
+        if isinstance(image, UploadedFile):
+            image = normalize_image(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,67 @@
+import re
+from urllib.parse import quote, unquote
+
+from django.template.loader import render_to_string
+
+from .models import Follow
+
+# Метка фрагмента в общем теле страницы. Текст постов экранируется
+# шаблонами, поэтому пользователь не может подставить такую метку сам.
+PLACEHOLDER = re.compile(r'<!--fragment:(\w+):([^>]*?)-->')
+
+_fragments = {}
+
+
+def fragment(func):
+    """Регистрирует функцию фрагмента под её именем."""
+    _fragments[func.__name__] = func
+    return func
+
+
+def placeholder(name, argument=''):
+    """Метка, на место которой при ответе встанет фрагмент."""
+    if name not in _fragments:
+        raise KeyError(f'Неизвестный фрагмент: {name}')
+    return f'<!--fragment:{name}:{quote(str(argument))}-->'
+
+
+def render_fragment(request, name, argument=''):
+    return _fragments[name](request, argument)
+
+
+def fill_fragments(request, content):
+    """Подставляет в общее тело фрагменты текущего пользователя."""
+    return PLACEHOLDER.sub(
+        lambda match: render_fragment(
+            request, match.group(1), unquote(match.group(2)),
+        ),
+        content,
+    )
+
+
+@fragment
+def user_nav(request, argument):
+    """Ссылки шапки: вход и регистрация или имя и выход."""
+    return render_to_string('includes/user_nav.html', request=request)
+
+
+@fragment
+def switcher(request, argument):
+    """Переключатель лент, argument - активная вкладка."""
+    return render_to_string('posts/includes/switcher.html', {
+        argument: True,
+    }, request=request)
+
+
+@fragment
+def follow_button(request, username):
+    """Кнопка подписки или выгрузки на странице автора."""
+    user = request.user
+    following = user.is_authenticated and Follow.objects.filter(
+        user=user, author__username=username,
+    ).exists()
+    return render_to_string('posts/includes/follow_button.html', {
+        'username': username,
+        'is_author': user.is_authenticated and user.username == username,
+        'following': following,
+    }, request=request)
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.feed import build_feed
+from posts.models import Feed, Follow
+
+
+class Command(BaseCommand):
+    help = 'Собирает материализованные ленты подписок пакетами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.FEED_BATCH_SIZE,
+            help='Сколько записей ленты вставлять за один запрос.',
+        )
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            default=[],
+            help='Собрать ленту только для этого пользователя.',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Пересобрать и уже существующие ленты.',
+        )
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.all()
+        if options['usernames']:
+            follows = follows.filter(user__username__in=options['usernames'])
+        user_ids = follows.values_list('user_id', flat=True).distinct()
+        if not options['rebuild']:
+            user_ids = user_ids.exclude(
+                user_id__in=Feed.objects.values('user_id'),
+            )
+        built = 0
+        for user_id in user_ids.order_by('user_id').iterator():
+            build_feed(user_id, options['batch_size'])
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'Собрано лент: {built}'))
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post
+from posts.search import search_posts
+
+BAD_STEPS = ('USE TEMP B-TREE',)
+
+
+def view_queries():
+    """Запросы представлений posts.views в виде (имя, queryset, строго).
+
+    Нестрогие запросы печатаются, но не валят проверку: сортировка
+    соединения через Follow неизбежна, для неё есть собранные ленты,
+    а поиск сортирует найденное по релевантности.
+    """
+    pages = settings.PAGES
+    now = timezone.now()
+    after = Q(pub_date__lt=now) | Q(pub_date=now, pk__lt=1)
+    posts = Post.objects.select_related('author', 'group')
+    yield 'index', posts[:pages], True
+    yield 'index cursor', posts.filter(after)[:pages + 1], True
+    yield 'group_list', posts.filter(group=1)[:pages], True
+    yield 'group_list cursor', posts.filter(group=1).filter(after)[
+        :pages + 1], True
+    yield 'profile', posts.filter(author=1)[:pages], True
+    yield 'profile cursor', posts.filter(author=1).filter(after)[
+        :pages + 1], True
+    yield 'profile following', Follow.objects.filter(
+        author=1, user=1), True
+    yield 'post_detail comments', Comment.objects.filter(
+        post=1).select_related('author'), True
+    feed = posts.filter(feed_items__user=1).annotate(
+        feed_date=F('feed_items__pub_date'),
+        feed_post=F('feed_items__post_id'),
+    ).order_by('-feed_date', '-feed_post')
+    yield 'follow_index feed', feed[:pages], True
+    yield 'follow_index feed cursor', feed.filter(
+        Q(feed_date__lt=now) | Q(feed_date=now, feed_post__lt=1)
+    )[:pages + 1], True
+    yield 'follow_index join', posts.filter(
+        author__following__user=1)[:pages], False
+    yield 'search', search_posts(posts, 'yatube')[:pages], False
+
+
+def bad_steps(plan):
+    """Шаги плана с полным просмотром таблицы или временной сортировкой."""
+    for detail in plan:
+        full_scan = detail.startswith('SCAN ') and ' USING ' not in detail
+        if full_scan or detail.startswith(BAD_STEPS):
+            yield detail
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет EXPLAIN QUERY PLAN запросов лент: ни один не должен '
+        'просматривать таблицу целиком или сортировать во временном B-tree.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка планов поддерживает только SQLite.')
+        failed = []
+        with connection.cursor() as cursor:
+            for name, queryset, strict in view_queries():
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+                problems = list(bad_steps(plan))
+                if problems and strict:
+                    failed.append(name)
+                    style = self.style.ERROR
+                elif problems:
+                    style = self.style.WARNING
+                else:
+                    style = self.style.SUCCESS
+                self.stdout.write(style(name))
+                for detail in plan:
+                    self.stdout.write(f'    {detail}')
+        if failed:
+            raise CommandError(
+                'Полный просмотр или сортировка в запросах: '
+                + ', '.join(failed)
+            )
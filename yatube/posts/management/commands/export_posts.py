@@ -0,0 +1,58 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import CONTENT_TYPES, export_stream
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты с комментариями (всего сайта, группы или автора) '
+        'потоком в JSON Lines или CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--group',
+            help='Выгрузить только посты группы с этим slug.',
+        )
+        parser.add_argument(
+            '--author',
+            help='Выгрузить только посты этого автора.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=tuple(CONTENT_TYPES),
+            default='jsonl',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать выгрузку в gzip.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки (по умолчанию stdout).',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['group']:
+            if not Group.objects.filter(slug=options['group']).exists():
+                raise CommandError(f'Нет группы {options["group"]}')
+            posts = posts.filter(group__slug=options['group'])
+        if options['author']:
+            if not User.objects.filter(username=options['author']).exists():
+                raise CommandError(f'Нет автора {options["author"]}')
+            posts = posts.filter(author__username=options['author'])
+        chunks = export_stream(posts, options['format'], options['gzip'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+            return
+        output = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,165 @@
+import os
+import shutil
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts.models import MediaFile, Post
+from posts.thumbnails import get_raw_many
+from posts.utils import batched
+
+
+def walk(storage, directory, min_age):
+    """Файлы каталога хранилища потоком: пары (имя, размер).
+
+    Каталоги читаются через scandir по одному, поэтому память не
+    зависит от числа файлов. Файлы моложе min_age секунд пропускаются:
+    их могли загрузить, но ещё не сохранить пост.
+    """
+    root = storage.path('')
+    deadline = time.time() - min_age
+    stack = [storage.path(directory)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    if stat.st_mtime <= deadline:
+                        name = os.path.relpath(entry.path, root)
+                        yield name.replace(os.sep, '/'), stat.st_size
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки, на которые не ссылается ни один пост, '
+        'и миниатюры без записи в хранилище sorl.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать, ничего не удалять.',
+        )
+        parser.add_argument(
+            '--quarantine',
+            metavar='DIR',
+            help='Переносить файлы в этот каталог вместо удаления.',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=0,
+            help='Не больше стольких файлов в секунду (0 - без ограничения).',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60 * 60 * 24,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько имён сверять с базой за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.removed = self.reclaimed = 0
+        self.collect_images()
+        self.collect_thumbnails()
+        verb = 'Можно освободить' if options['dry_run'] else 'Освобождено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: {filesizeformat(self.reclaimed)} '
+            f'в файлах: {self.removed}'
+        ))
+
+    def remove(self, storage, name, size):
+        self.removed += 1
+        self.reclaimed += size
+        if self.options['dry_run']:
+            self.stdout.write(f'Лишний файл: {name}')
+            return
+        if self.options['quarantine']:
+            target = os.path.join(self.options['quarantine'], name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(storage.path(name), target)
+        else:
+            storage.delete(name)
+        if self.options['rate']:
+            time.sleep(1 / self.options['rate'])
+
+    def collect_images(self):
+        """Картинки постов без ссылок и их миниатюры."""
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        files = walk(storage, field.upload_to, self.options['min_age'])
+        for batch in batched(files, self.options['batch_size']):
+            names = [name for name, _ in batch]
+            live = set(Post.objects.filter(image__in=names).values_list(
+                'image', flat=True))
+            live.update(MediaFile.objects.filter(
+                name__in=names, refs__gt=0,
+            ).values_list('name', flat=True))
+            for name, size in batch:
+                if name not in live:
+                    self.remove_thumbnails(name, storage)
+                    self.remove(storage, name, size)
+
+    def remove_thumbnails(self, name, storage):
+        """Миниатюры и записи sorl для удаляемой картинки."""
+        from sorl.thumbnail import default
+        from sorl.thumbnail.images import ImageFile
+
+        # Картинки до переноса в хеш-хранилище записаны в sorl
+        # с хранилищем по умолчанию.
+        sources = {
+            source.key: source
+            for source in (
+                ImageFile(name, storage), ImageFile(name, default_storage),
+            )
+        }
+        for source in sources.values():
+            keys = default.kvstore._get(source.key, identity='thumbnails')
+            for key in keys or []:
+                thumbnail = default.kvstore._get(key)
+                if thumbnail is not None and thumbnail.exists():
+                    self.remove(
+                        thumbnail.storage,
+                        thumbnail.name,
+                        thumbnail.storage.size(thumbnail.name),
+                    )
+            if not self.options['dry_run']:
+                default.kvstore.delete(source)
+
+    def collect_thumbnails(self):
+        """Файлы миниатюр, о которых sorl уже ничего не знает."""
+        from sorl.thumbnail import default
+        from sorl.thumbnail.conf import settings as sorl_settings
+        from sorl.thumbnail.images import ImageFile
+        from sorl.thumbnail.kvstores.base import add_prefix
+
+        files = walk(
+            default.storage,
+            sorl_settings.THUMBNAIL_PREFIX,
+            self.options['min_age'],
+        )
+        for batch in batched(files, self.options['batch_size']):
+            keys = {
+                name: add_prefix(ImageFile(name, default.storage).key)
+                for name, _ in batch
+            }
+            known = get_raw_many(list(keys.values()))
+            for name, size in batch:
+                if keys[name] not in known:
+                    self.remove(default.storage, name, size)
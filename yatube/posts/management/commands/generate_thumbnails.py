@@ -0,0 +1,48 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_for_post, get_executor
+from posts.utils import batched
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры картинок существующих постов параллельно.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS or os.cpu_count(),
+            help='Число процессов (0 - без пула, в текущем процессе).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Сколько постов отдавать пулу за один раз.',
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Только посты без превью-заглушки (ещё не обработанные).',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if options['missing']:
+            posts = posts.filter(image_placeholder='')
+        post_ids = posts.order_by('pk').values_list('pk', flat=True)
+        if options['workers']:
+            run = get_executor(options['workers']).map
+        else:
+            run = map
+        done = 0
+        for batch in batched(post_ids.iterator(), options['batch_size']):
+            done += sum(1 for count in run(generate_for_post, batch) if count)
+            self.stdout.write(f'Обработано постов: {done}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры созданы для постов: {done}'
+        ))
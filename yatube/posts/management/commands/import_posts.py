@@ -0,0 +1,292 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import csv
+from itertools import islice
+import json
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import media
+from posts.feed import build_feed
+from posts.models import Comment, Feed, Follow, Group, Post
+from posts.uploads import image_dimensions
+from posts.utils import batched
+
+User = get_user_model()
+
+TYPES = ('post', 'comment', 'follow')
+
+
+def read_records(path, file_format, record_type):
+    """Записи файла потоком: JSON Lines или CSV с заголовком."""
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            for row in csv.DictReader(source):
+                row.setdefault('type', record_type)
+                yield row
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+@contextmanager
+def source_dates():
+    """Отключает auto_now_add, чтобы bulk_create сохранил даты источника."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def parse_id(value):
+    """Id записи числом: в CSV все поля - строки, пустое поле - без id."""
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise CommandError(f'Неверный id: {value}')
+
+
+def parse_date(value):
+    """Дата из ISO-строки источника, без зоны считается в TIME_ZONE."""
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise CommandError(f'Неверная дата: {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты, комментарии и подписки из JSON Lines или CSV '
+        'пакетами bulk_create, с продолжением с контрольной точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с записями.')
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Формат файла (по умолчанию по расширению).',
+        )
+        parser.add_argument(
+            '--type',
+            choices=TYPES,
+            default='post',
+            help='Тип записей без поля type (для CSV - всего файла).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки (по умолчанию <path>.checkpoint).',
+        )
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help=(
+                'Не пересчитывать счётчики, ленты и кеш и не создавать '
+                'миниатюры после импорта (generate_thumbnails --missing).'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        self.default_type = options['type']
+        self.checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.skipped = 0
+        done = self.read_checkpoint()
+        if done:
+            self.stdout.write(f'Продолжение с записи {done}')
+        records = islice(
+            read_records(path, file_format, self.default_type), done, None,
+        )
+        with source_dates():
+            for batch in batched(records, options['batch_size']):
+                with transaction.atomic():
+                    self.import_batch(batch)
+                done += len(batch)
+                self.write_checkpoint(done)
+                self.stdout.write(f'Импортировано записей: {done}')
+        if self.skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Пропущено записей без поста: {self.skipped}'
+            ))
+        if not options['skip_rebuild']:
+            self.rebuild()
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён, записей: {done}'
+        ))
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint) as checkpoint:
+                return json.load(checkpoint)['done']
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, done):
+        # Через временный файл: обрыв не оставит точку недописанной.
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w') as checkpoint:
+            json.dump({'done': done}, checkpoint)
+        os.replace(temporary, self.checkpoint)
+
+    def import_batch(self, batch):
+        """Один пакет: недостающие авторы и группы, затем bulk_create."""
+        records = defaultdict(list)
+        for record in batch:
+            record_type = record.get('type') or self.default_type
+            if record_type not in TYPES:
+                raise CommandError(f'Неизвестный тип записи: {record_type}')
+            records[record_type].append(record)
+        self.resolve_users({
+            record[field]
+            for record_type, fields in (
+                ('post', ('author',)),
+                ('comment', ('author',)),
+                ('follow', ('user', 'author')),
+            )
+            for record in records[record_type]
+            for field in fields
+        })
+        self.resolve_groups({
+            record['group']
+            for record in records['post'] if record.get('group')
+        })
+        posts = [self.make_post(record) for record in records['post']]
+        existing = set(Post.objects.filter(
+            pk__in=[post.pk for post in posts if post.pk is not None],
+        ).values_list('pk', flat=True))
+        Post.objects.bulk_create(posts, ignore_conflicts=True)
+        # Сигналов у bulk_create нет: ссылки на картинки новых постов
+        # учитываются здесь, по одному UPDATE на файл.
+        images = Counter(
+            post.image.name for post in posts
+            if post.image and post.pk not in existing
+        )
+        for name, count in images.items():
+            media.acquire(name, count)
+        comments = records['comment']
+        post_ids = set(Post.objects.filter(
+            pk__in={int(record['post']) for record in comments},
+        ).values_list('pk', flat=True))
+        Comment.objects.bulk_create(
+            [
+                self.make_comment(record) for record in comments
+                if int(record['post']) in post_ids
+            ],
+            ignore_conflicts=True,
+        )
+        self.skipped += sum(
+            1 for record in comments if int(record['post']) not in post_ids
+        )
+        Follow.objects.bulk_create(
+            [
+                Follow(
+                    user_id=self.users[record['user']],
+                    author_id=self.users[record['author']],
+                )
+                for record in records['follow']
+                if record['user'] != record['author']
+            ],
+            ignore_conflicts=True,
+        )
+
+    def resolve_users(self, usernames):
+        """Дополняет карту пользователей, создавая недостающих без пароля."""
+        missing = usernames - self.users.keys()
+        if not missing:
+            return
+        User.objects.bulk_create(
+            [
+                User(username=username, password=make_password(None))
+                for username in missing
+            ],
+            ignore_conflicts=True,
+        )
+        self.users.update(User.objects.filter(
+            username__in=missing,
+        ).values_list('username', 'pk'))
+
+    def resolve_groups(self, slugs):
+        """Дополняет карту групп, создавая недостающие по slug."""
+        missing = slugs - self.groups.keys()
+        if not missing:
+            return
+        Group.objects.bulk_create(
+            [Group(slug=slug, title=slug) for slug in missing],
+            ignore_conflicts=True,
+        )
+        self.groups.update(Group.objects.filter(
+            slug__in=missing,
+        ).values_list('slug', 'pk'))
+
+    def make_post(self, record):
+        group = record.get('group')
+        post = Post(
+            id=parse_id(record.get('id')),
+            text=record['text'],
+            author_id=self.users[record['author']],
+            group_id=self.groups[group] if group else None,
+            pub_date=parse_date(record.get('pub_date')),
+            image=record.get('image') or '',
+        )
+        post.image_width, post.image_height = image_dimensions(post.image)
+        return post
+
+    def make_comment(self, record):
+        return Comment(
+            id=parse_id(record.get('id')),
+            post_id=int(record['post']),
+            author_id=self.users[record['author']],
+            text=record['text'],
+            created=parse_date(record.get('created')),
+        )
+
+    def rebuild(self):
+        """Счётчики, ленты, миниатюры и кеш страниц - одним проходом."""
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command(
+            'generate_thumbnails',
+            missing=True,
+            workers=settings.THUMBNAIL_WORKERS,
+            stdout=self.stdout,
+        )
+        feeds = Feed.objects.order_by('user_id').values_list(
+            'user_id', flat=True)
+        for user_id in feeds.iterator():
+            build_feed(user_id)
+        cache.clear()
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import media
+from posts.cache import bump, post_dependencies
+from posts.models import Post
+from posts.utils import batched
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище с именами по хешу '
+        'содержимого и заводит учёт ссылок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Сколько разных файлов переносить за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--keep-originals',
+            action='store_true',
+            help='Не удалять старые файлы после переноса.',
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        names = (
+            Post.objects.exclude(image='').order_by('image')
+            .values_list('image', flat=True).distinct()
+        )
+        moved = missing = 0
+        for batch in batched(names.iterator(), options['batch_size']):
+            old_names = [
+                name for name in batch if not storage.is_hashed(name)
+            ]
+            with transaction.atomic():
+                for old_name in old_names:
+                    if not storage.exists(old_name):
+                        missing += 1
+                        continue
+                    with storage.open(old_name) as content:
+                        new_name = storage.save(old_name, content)
+                    posts = list(Post.objects.select_related(
+                        'author', 'group',
+                    ).filter(image=old_name))
+                    Post.objects.filter(
+                        pk__in=[post.pk for post in posts],
+                    ).update(image=new_name)
+                    media.acquire(new_name, count=len(posts))
+                    for post in posts:
+                        bump(*post_dependencies(post))
+                    if not options['keep_originals']:
+                        transaction.on_commit(
+                            lambda name=old_name: storage.delete(name)
+                        )
+                    moved += 1
+            self.stdout.write(f'Перенесено файлов: {moved}')
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'Не найдено файлов: {missing}'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово, перенесено файлов: {moved}'
+        ))
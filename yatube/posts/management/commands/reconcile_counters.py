@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_groups, reconcile_posts, reconcile_users
+from posts.models import Group, Post
+from posts.utils import batched
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает разошедшиеся счётчики пакетами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько объектов сверять за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        targets = (
+            ('пользователей', User.objects, reconcile_users),
+            ('групп', Group.objects, reconcile_groups),
+            ('постов', Post.objects, reconcile_posts),
+        )
+        for name, manager, reconcile in targets:
+            ids = manager.order_by('pk').values_list('pk', flat=True)
+            fixed = sum(
+                reconcile(batch)
+                for batch in batched(ids.iterator(), options['batch_size'])
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f'Исправлено счётчиков {name}: {fixed}')
+            )
@@ -0,0 +1,35 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import MediaFile, Post
+
+
+def acquire(name, count=1):
+    """Добавляет ссылки постов на файл хранилища."""
+    if not name:
+        return
+    MediaFile.objects.get_or_create(name=name)
+    MediaFile.objects.filter(name=name).update(refs=F('refs') + count)
+
+
+def release(name):
+    """Снимает ссылку на файл; файл без ссылок удаляется после коммита.
+
+    Файлы, которых нет в учёте (старые, не перенесённые migrate_media),
+    не трогаются.
+    """
+    if not name:
+        return
+    MediaFile.objects.filter(name=name, refs__gt=0).update(
+        refs=F('refs') - 1,
+    )
+    if MediaFile.objects.filter(name=name, refs=0).delete()[0]:
+        transaction.on_commit(partial(_delete_file, name))
+
+
+def _delete_file(name):
+    # Между коммитом и удалением файл могли загрузить снова.
+    if not MediaFile.objects.filter(name=name).exists():
+        Post._meta.get_field('image').storage.delete(name)
@@ -0,0 +1,100 @@
+from django.db import migrations
+
+# Полнотекстовый индекс постов: текст поста и тексты его комментариев.
+# rowid строки индекса совпадает с id поста.
+CREATE_SQL = (
+    """
+    CREATE VIRTUAL TABLE posts_post_search USING fts5(
+        text, comments, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_post_search_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search (rowid, text, comments)
+        VALUES (new.id, new.text, '');
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_search_update AFTER UPDATE OF text
+    ON posts_post
+    BEGIN
+        UPDATE posts_post_search SET text = new.text WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_search_delete AFTER DELETE ON posts_post
+    BEGIN
+        DELETE FROM posts_post_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_comment_search_insert AFTER INSERT
+    ON posts_comment
+    BEGIN
+        UPDATE posts_post_search SET comments = (
+            SELECT group_concat(text, ' ') FROM posts_comment
+            WHERE post_id = new.post_id
+        ) WHERE rowid = new.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_comment_search_update AFTER UPDATE OF text, post_id
+    ON posts_comment
+    BEGIN
+        UPDATE posts_post_search SET comments = coalesce((
+            SELECT group_concat(text, ' ') FROM posts_comment
+            WHERE post_id = posts_post_search.rowid
+        ), '') WHERE rowid IN (old.post_id, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_comment_search_delete AFTER DELETE
+    ON posts_comment
+    BEGIN
+        UPDATE posts_post_search SET comments = coalesce((
+            SELECT group_concat(text, ' ') FROM posts_comment
+            WHERE post_id = old.post_id
+        ), '') WHERE rowid = old.post_id;
+    END
+    """,
+    """
+    INSERT INTO posts_post_search (rowid, text, comments)
+    SELECT id, text, coalesce((
+        SELECT group_concat(posts_comment.text, ' ') FROM posts_comment
+        WHERE posts_comment.post_id = posts_post.id
+    ), '') FROM posts_post
+    """,
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS posts_comment_search_delete',
+    'DROP TRIGGER IF EXISTS posts_comment_search_update',
+    'DROP TRIGGER IF EXISTS posts_comment_search_insert',
+    'DROP TRIGGER IF EXISTS posts_post_search_delete',
+    'DROP TRIGGER IF EXISTS posts_post_search_update',
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    'DROP TABLE IF EXISTS posts_post_search',
+)
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_media_files'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL),
+        ),
+    ]
@@ -0,0 +1,86 @@
+from importlib import import_module
+
+from django.db import migrations
+
+post_search = import_module('posts.migrations.0017_post_search')
+
+# Комментарии индексируются отдельными строками: rowid строки равен
+# id комментария, post_id хранится без индексации. Изменение одного
+# комментария трогает одну строку индекса, а не все комментарии поста.
+CREATE_SQL = (
+    'DROP TRIGGER IF EXISTS posts_comment_search_delete',
+    'DROP TRIGGER IF EXISTS posts_comment_search_update',
+    'DROP TRIGGER IF EXISTS posts_comment_search_insert',
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    'DROP TABLE IF EXISTS posts_post_search',
+    """
+    CREATE VIRTUAL TABLE posts_post_search USING fts5(
+        text, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_post_search_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search (rowid, text)
+        VALUES (new.id, new.text);
+    END
+    """,
+    """
+    INSERT INTO posts_post_search (rowid, text)
+    SELECT id, text FROM posts_post
+    """,
+    """
+    CREATE VIRTUAL TABLE posts_comment_search USING fts5(
+        text, post_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_comment_search_insert AFTER INSERT
+    ON posts_comment
+    BEGIN
+        INSERT INTO posts_comment_search (rowid, text, post_id)
+        VALUES (new.id, new.text, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_comment_search_update AFTER UPDATE OF text, post_id
+    ON posts_comment
+    BEGIN
+        UPDATE posts_comment_search SET text = new.text, post_id = new.post_id
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_comment_search_delete AFTER DELETE
+    ON posts_comment
+    BEGIN
+        DELETE FROM posts_comment_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO posts_comment_search (rowid, text, post_id)
+    SELECT id, text, post_id FROM posts_comment
+    """,
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS posts_comment_search_delete',
+    'DROP TRIGGER IF EXISTS posts_comment_search_update',
+    'DROP TRIGGER IF EXISTS posts_comment_search_insert',
+    'DROP TABLE IF EXISTS posts_comment_search',
+) + post_search.DROP_SQL + post_search.CREATE_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            post_search.run_on_sqlite(CREATE_SQL),
+            post_search.run_on_sqlite(DROP_SQL),
+        ),
+    ]
@@ -1,12 +1,35 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 CUT_TEXT = 15
 
 
-class Group(models.Model):
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики при сохранении загруженного объекта.
+
+    Счётчики меняются только атомарными UPDATE с F(), а сохранение
+    формы записало бы в них значение, прочитанное до этих UPDATE.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CounterFieldsMixin, models.Model):
     title = models.CharField(
         verbose_name="Имя",
         help_text="Укажите имя группы.",
@@ -21,6 +44,13 @@ class Group(models.Model):
         verbose_name="Описание",
         help_text="Укажите описание группы.",
     )
+    posts_count = models.PositiveIntegerField(
+        verbose_name="Число постов",
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ("posts_count",)
 
     def __str__(self) -> str:
         return self.title
@@ -30,7 +60,7 @@ class Group(models.Model):
         verbose_name_plural = "Группы"
 
 
-class Post(models.Model):
+class Post(CounterFieldsMixin, models.Model):
     text = models.TextField(
         verbose_name="Текст поста",
         help_text="Текст нового поста",
@@ -59,14 +89,51 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name="Картинка",
         upload_to="posts/",
+        storage=ContentAddressedStorage(),
         blank=True,
         help_text="Загрузите картинку",
     )
+    image_width = models.PositiveIntegerField(
+        verbose_name="Ширина картинки",
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        verbose_name="Высота картинки",
+        null=True,
+        editable=False,
+    )
+    image_placeholder = models.TextField(
+        verbose_name="Превью картинки",
+        blank=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name="Число комментариев",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
-        ordering = ("-pub_date",)
+        ordering = ("-pub_date", "-id")
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="post_date_idx",
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_date_idx",
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_date_idx",
+            ),
+        ]
+
+    counter_fields = ("comments_count",)
 
     def __str__(self):
         return self.text[:CUT_TEXT]
@@ -97,8 +164,15 @@ class Comment(models.Model):
     )
 
     class Meta:
+        ordering = ("created", "id")
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=["post", "created", "id"],
+                name="comment_post_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.text[:CUT_TEXT]
@@ -121,3 +195,108 @@ class Follow(models.Model):
     class Meta:
         verbose_name = "Подписчик"
         verbose_name_plural = "Подписчики"
+        indexes = [
+            models.Index(
+                fields=["author", "user"],
+                name="follow_author_user_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"],
+                name="unique_follow",
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name="Пользователь",
+        related_name="stats",
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name="Число постов",
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name="Число подписчиков",
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name="Число подписок",
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
+
+
+class Feed(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Подписчик",
+        related_name="feed",
+    )
+    built = models.DateTimeField(
+        verbose_name="Дата сборки",
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = "Лента подписок"
+        verbose_name_plural = "Ленты подписок"
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Подписчик",
+        related_name="feed_items",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name="Пост",
+        related_name="feed_items",
+    )
+    pub_date = models.DateTimeField(
+        verbose_name="Дата публикации",
+    )
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="feed_item_user_date_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"],
+                name="unique_feed_item",
+            ),
+        ]
+
+
+class MediaFile(models.Model):
+    name = models.CharField(
+        verbose_name="Имя файла",
+        max_length=255,
+        primary_key=True,
+    )
+    refs = models.PositiveIntegerField(
+        verbose_name="Число ссылок",
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = "Файл хранилища"
+        verbose_name_plural = "Файлы хранилища"
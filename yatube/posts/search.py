@@ -0,0 +1,67 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Comment
+
+# Таблицы FTS5 из миграций 0017_post_search и 0018_comment_search:
+# rowid строки равен id поста или комментария.
+SEARCH_TABLE = 'posts_post_search'
+COMMENT_SEARCH_TABLE = 'posts_comment_search'
+# Вес совпадения в тексте поста и в комментариях для bm25.
+TEXT_WEIGHT = 2.0
+COMMENTS_WEIGHT = 1.0
+
+
+def match_query(text):
+    """Запрос FTS5 из пользовательской строки.
+
+    Каждое слово берётся в кавычки, чтобы символы синтаксиса FTS5
+    не ломали запрос, и ищется по префиксу. Слова объединяются через AND.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+def search_posts(queryset, text):
+    """Посты queryset, подходящие под запрос, лучшие по bm25 первыми.
+
+    Пост находится по своему тексту или по любому комментарию. Ранг -
+    взвешенная сумма bm25 текста и лучшего комментария поста.
+    Вне SQLite индекса нет, и поиск идёт обычным LIKE.
+    """
+    query = match_query(text)
+    if not query:
+        return queryset.none()
+    if connection.vendor != 'sqlite':
+        return queryset.filter(
+            Q(text__icontains=text) | Q(comments__text__icontains=text)
+        ).distinct()
+    table = queryset.model._meta.db_table
+    comments = Comment._meta.db_table
+    text_rank = (
+        f'SELECT bm25({SEARCH_TABLE}) FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s AND rowid = {table}.id'
+    )
+    comment_rank = (
+        f'SELECT bm25({COMMENT_SEARCH_TABLE}) FROM {COMMENT_SEARCH_TABLE} '
+        f'WHERE {COMMENT_SEARCH_TABLE} MATCH %s AND rowid IN '
+        f'(SELECT id FROM {comments} WHERE post_id = {table}.id) '
+        f'ORDER BY 1 LIMIT 1'
+    )
+    return queryset.extra(
+        select={
+            'search_rank': (
+                f'{TEXT_WEIGHT} * coalesce(({text_rank}), 0) + '
+                f'{COMMENTS_WEIGHT} * coalesce(({comment_rank}), 0)'
+            ),
+        },
+        select_params=[query, query],
+        where=[
+            f'{table}.id IN (SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s UNION '
+            f'SELECT post_id FROM {COMMENT_SEARCH_TABLE} '
+            f'WHERE {COMMENT_SEARCH_TABLE} MATCH %s)',
+        ],
+        params=[query, query],
+    ).order_by('search_rank', '-pub_date', '-id')
@@ -0,0 +1,138 @@
+from functools import partial
+import threading
+
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from . import counters, feed, media, thumbnails
+from .cache import bump, follow_dependencies, post_dependencies
+from .models import Comment, Follow, Group, Post
+from .uploads import image_dimensions
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    """Запоминает прежние группу и картинку редактируемого поста.
+
+    Для новой картинки записывает её размеры, читая только заголовок.
+    """
+    instance._old_group_id, instance._old_image = None, None
+    if instance.pk is not None and not raw:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk,
+        ).values_list('group_id', 'image').first() or (None, None)
+    if instance.image.name != instance._old_image:
+        instance.image_placeholder = ''
+        instance.image_width, instance.image_height = image_dimensions(
+            instance.image,
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    """Новый пост попадает в ленты подписчиков."""
+    if raw:
+        return
+    if created:
+        feed.fan_out_post(instance)
+        counters.change_user_stats(instance.author_id, posts_count=1)
+        counters.change_group_posts(instance.group_id, 1)
+    elif instance._old_group_id != instance.group_id:
+        counters.change_group_posts(instance._old_group_id, -1)
+        counters.change_group_posts(instance.group_id, 1)
+    if instance.image.name != instance._old_image:
+        media.acquire(instance.image.name)
+        media.release(instance._old_image)
+    if instance.image and instance.image.name != instance._old_image:
+        transaction.on_commit(partial(thumbnails.schedule, instance.pk))
+    bump(*post_dependencies(instance, instance._old_group_id))
+
+
+# Посты, удаляемые в текущем потоке. Коллектор шлёт все pre_delete
+# раньше любых post_delete, поэтому комментарии каскада успевают
+# получить отметку до своего post_delete.
+_deleting = threading.local()
+
+
+def _deleting_posts():
+    if not hasattr(_deleting, 'post_ids'):
+        _deleting.post_ids = set()
+    return _deleting.post_ids
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    _deleting_posts().add(instance.pk)
+
+
+@receiver(pre_delete, sender=Comment)
+def comment_deleting(sender, instance, **kwargs):
+    instance._post_deleting = instance.post_id in _deleting_posts()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts().discard(instance.pk)
+    media.release(instance.image.name)
+    counters.change_user_stats(instance.author_id, posts_count=-1)
+    counters.change_group_posts(instance.group_id, -1)
+    bump(*post_dependencies(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    """Комментарий меняет страницы, на которых виден его пост."""
+    if instance.post_id is None or raw:
+        return
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+    bump(*post_dependencies(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Удалённый комментарий сдвигает счётчик и страницы своего поста.
+
+    Комментарии, удаляемые каскадом вместе с постом, пропускаются:
+    счётчик уходит с постом, страницы сбросит сигнал самого поста.
+    """
+    if getattr(instance, '_post_deleting', False):
+        return
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=instance.post_id,
+    ).first()
+    if post is None:
+        return
+    counters.change_post_comments(post.pk, -1)
+    bump(*post_dependencies(post))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    """Подписка дополняет ленту подписчика постами автора."""
+    if raw:
+        return
+    if created:
+        feed.backfill_follow(instance)
+        counters.change_user_stats(instance.user_id, following_count=1)
+        counters.change_user_stats(instance.author_id, followers_count=1)
+    bump(*follow_dependencies(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Отписка очищает ленту подписчика от постов автора."""
+    feed.purge_follow(instance)
+    counters.change_user_stats(instance.user_id, following_count=-1)
+    counters.change_user_stats(instance.author_id, followers_count=-1)
+    bump(*follow_dependencies(instance))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump(f'group:{instance.slug}')
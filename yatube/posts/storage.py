@@ -0,0 +1,49 @@
+from hashlib import sha256
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Имя файла в хранилище: <каталог>/ab/cd/<sha256>.<расширение>.
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, где имя файла - хеш его содержимого.
+
+    Файлы раскладываются по двум уровням каталогов из первых символов
+    хеша, поэтому ни один каталог не разрастается. Одинаковые загрузки
+    получают одно имя и хранятся один раз; сколько постов ссылается на
+    файл, считает posts.media.
+    """
+
+    def hashed_name(self, name, content):
+        """Имя файла по SHA-256 содержимого, хеш считается по кускам."""
+        digest = sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        key = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            posixpath.dirname(name), key[:2], key[2:4], key + extension,
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+    def is_hashed(self, name):
+        """Лежит ли файл уже по имени из хеша содержимого."""
+        return bool(HASHED_NAME.search(name))
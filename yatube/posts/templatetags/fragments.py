@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..fragments import placeholder, render_fragment
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def user_fragment(context, name, argument=''):
+    """Пользовательский фрагмент страницы.
+
+    На общих страницах (request.shared_page) выводится метка, которую
+    заполняет cache_page_with_deps, на остальных - сам фрагмент.
+    """
+    request = context['request']
+    if getattr(request, 'shared_page', False):
+        return mark_safe(placeholder(name, argument))
+    return mark_safe(render_fragment(request, name, argument))
@@ -0,0 +1,73 @@
+from hashlib import md5
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from ..cache import dependency_versions
+from ..thumbnails import prefetch_variants
+from ..utils import attach_last_comments
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_pattern.html'
+
+
+def card_key(post, show_author, post_version, lazy=False):
+    """Ключ карточки: id поста и версия всего, что в ней выводится.
+
+    post_version сдвигается при любой записи в пост и его комментарии.
+    """
+    parts = [
+        post.pk,
+        post_version,
+        post.text,
+        post.image.name,
+        post.pub_date.isoformat(),
+        post.comments_count,
+        post.image_placeholder,
+        show_author,
+        lazy,
+    ]
+    if show_author:
+        parts.extend((post.author.username, post.author.get_full_name()))
+    version = md5('|'.join(map(str, parts)).encode()).hexdigest()
+    return f'post_card:{post.pk}:{version}'
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки постов страницы в виде пар (пост, html).
+
+    Все карточки читаются из кеша одним запросом, шаблон рендерится
+    только для промахов. Последние комментарии и миниатюры картинок
+    тоже выбираются только для них, одним запросом на страницу.
+    """
+    author = context.get('author')
+    posts = list(posts)
+    versions = dependency_versions([f'post:{post.pk}' for post in posts])
+    cards = {
+        card_key(post, not author, version, lazy=number > 0): post
+        for number, (post, version) in enumerate(zip(posts, versions))
+    }
+    rendered = cache.get_many(list(cards))
+    misses = {
+        key: post for key, post in cards.items() if key not in rendered
+    }
+    attach_last_comments(list(misses.values()))
+    prefetch_variants(misses.values())
+    first = posts[0] if posts else None
+    missing = {
+        key: render_to_string(CARD_TEMPLATE, {
+            'post': post,
+            'author': author,
+            'lazy': post is not first,
+        })
+        for key, post in misses.items()
+    }
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+        rendered.update(missing)
+    return [(post, mark_safe(rendered[key])) for key, post in cards.items()]
@@ -0,0 +1,45 @@
+from django import template
+from django.conf import settings
+
+from ..thumbnails import prefetch_variants, variants
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post, lazy=False):
+    """Картинка поста: srcset по ширинам, WebP, размеры и превью.
+
+    lazy включает отложенную загрузку для карточек ниже первого экрана.
+    Миниатюры берутся из post.thumbnails, если страница их уже выбрала.
+    Ещё не созданные миниатюры пропускаются: их делает фоновый пул,
+    а до тех пор показывается оригинал поверх превью-заглушки.
+    """
+    if not post.image:
+        return {}
+    if not hasattr(post, 'thumbnails'):
+        prefetch_variants([post])
+    srcsets = {
+        image_format: [] for image_format in settings.POST_IMAGE_FORMATS
+    }
+    for width, height, image_format in variants():
+        thumbnail = post.thumbnails.get((width, height, image_format))
+        if thumbnail is not None:
+            srcsets[image_format].append(f'{thumbnail.url} {width}w')
+    width, height = settings.POST_IMAGE_SIZE
+    jpeg = srcsets.get('JPEG', [])
+    if jpeg:
+        src, box = jpeg[-1].rsplit(' ', 1)[0], (width, height)
+    else:
+        # Оригинал резервирует место по своим сохранённым размерам.
+        src, box = post.image.url, (post.image_width, post.image_height)
+    return {
+        'post': post,
+        'webp_srcset': ', '.join(srcsets.get('WEBP', [])),
+        'srcset': ', '.join(jpeg),
+        'src': src,
+        'sizes': f'(max-width: {width}px) 100vw, {width}px',
+        'width': box[0],
+        'height': box[1],
+        'lazy': lazy,
+    }
@@ -0,0 +1,142 @@
+from collections import namedtuple
+import re
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Точки сохранения транзакций не считаются: это не обращения к данным.
+TRANSACTION_CONTROL = re.compile(r'(RELEASE |ROLLBACK TO )?SAVEPOINT ')
+
+# Бюджет view: сколько запросов к базе он может сделать, аргументы
+# reverse по засеянным данным и метод с данными формы.
+Budget = namedtuple(
+    'Budget', 'queries args method data', defaults=(None, 'get', None),
+)
+
+# Бюджеты запросов для каждого имени URL из posts.urls. В число
+# входят чтение сессии и пользователя (2 запроса) и сигналы записи.
+QUERY_BUDGETS = {
+    'index': Budget(5),
+    'group_list': Budget(6, args=lambda data: (data.group.slug,)),
+    'profile': Budget(7, args=lambda data: (data.author.username,)),
+    'post_detail': Budget(5, args=lambda data: (data.post.pk,)),
+    'post_create': Budget(3),
+    'post_edit': Budget(4, args=lambda data: (data.post.pk,)),
+    'add_comment': Budget(
+        5,
+        args=lambda data: (data.post.pk,),
+        method='post',
+        data={'text': 'Комментарий'},
+    ),
+    'follow_index': Budget(5),
+    'search': Budget(6, data={'q': 'пост'}),
+    'export_posts': Budget(4),
+    'profile_follow': Budget(
+        11, args=lambda data: (data.stranger.username,),
+    ),
+    'profile_unfollow': Budget(
+        8, args=lambda data: (data.followed.username,),
+    ),
+}
+
+
+class QueryBudgetMixin:
+    """Проверка числа запросов view на данных двух размеров.
+
+    View не должен выходить за бюджет и делать больше запросов на
+    большем наборе данных: такой рост - признак N+1. В сообщении об
+    ошибке перечисляются все запросы обоих прогонов.
+    """
+
+    budgets = QUERY_BUDGETS
+    # Меньше страницы и несколько страниц: карточек на странице
+    # становится больше, число запросов должно остаться прежним.
+    sizes = (2, settings.PAGES * 2)
+
+    def seed(self, size):
+        """Автор с size постами, size его подписок с постами.
+
+        У каждого поста есть комментарий, чтобы на любой странице
+        выполнялась выборка последних комментариев.
+        """
+        author = User.objects.create(username='budget_author')
+        group = Group.objects.create(title='Группа', slug='budget-group')
+        User.objects.bulk_create([
+            User(username=f'budget_user_{number}') for number in range(size)
+        ])
+        others = list(User.objects.filter(
+            username__startswith='budget_user',
+        ))
+        posts = [
+            Post.objects.create(
+                author=author, group=group, text=f'Мой пост {number}',
+            )
+            for number in range(size)
+        ]
+        for post, other in zip(posts, others):
+            Comment.objects.create(post=post, author=other, text='Отзыв')
+            other_post = Post.objects.create(
+                author=other, group=group, text='Чужой пост',
+            )
+            Comment.objects.create(
+                post=other_post, author=author, text='Ответ',
+            )
+            Follow.objects.create(user=author, author=other)
+        return SimpleNamespace(
+            author=author,
+            group=group,
+            post=posts[0],
+            followed=others[0],
+            stranger=User.objects.create(username='budget_stranger'),
+        )
+
+    def run_view(self, name, budget):
+        """Запросы одного обращения к view на свежих данных."""
+        with transaction.atomic():
+            data = self.seed(self.current_size)
+            self.client.force_login(data.author)
+            cache.clear()
+            args = budget.args(data) if budget.args else None
+            url = reverse(f'posts:{name}', args=args)
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(self.client, budget.method)(
+                    url, budget.data or {},
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, url)
+            transaction.set_rollback(True)
+        return [
+            query['sql'] for query in context.captured_queries
+            if not TRANSACTION_CONTROL.match(query['sql'])
+        ]
+
+    def assertQueryBudget(self, name):
+        budget = self.budgets[name]
+        runs = {}
+        for size in self.sizes:
+            self.current_size = size
+            runs[size] = self.run_view(name, budget)
+        counts = {size: len(queries) for size, queries in runs.items()}
+        small, large = (runs[size] for size in self.sizes)
+        if len(large) > len(small) or max(counts.values()) > budget.queries:
+            report = '\n'.join(
+                f'--- {size} записей, {len(queries)} запросов:\n' + '\n'.join(
+                    f'{number}. {sql}'
+                    for number, sql in enumerate(queries, 1)
+                )
+                for size, queries in runs.items()
+            )
+            self.fail(
+                f'{name}: запросов {counts}, бюджет {budget.queries}, '
+                f'число не должно расти с данными\n{report}'
+            )
@@ -0,0 +1,144 @@
+from http import HTTPStatus
+
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import (
+    Comment, FeedItem, Follow, Group, MediaFile, Post, UserStats,
+)
+from ..feed import build_feed
+
+User = get_user_model()
+
+
+class AdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password',
+        )
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group,
+            )
+            for number in range(5)
+        ]
+        cls.comments = [
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий',
+            )
+            for post in cls.posts
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context)
+
+    def test_changelists_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк."""
+        more_rows = {
+            'post': lambda user: Post.objects.create(
+                text='Ещё пост', author=user, group=self.group,
+            ),
+            'comment': lambda user: Comment.objects.create(
+                post=self.posts[0], author=user, text='Ещё комментарий',
+            ),
+            'follow': lambda user: Follow.objects.create(
+                user=user, author=self.author,
+            ),
+        }
+        for model, add_row in more_rows.items():
+            url = reverse(f'admin:posts_{model}_changelist')
+            with self.subTest(model=model):
+                expected = self.changelist_queries(url)
+                for number in range(3):
+                    add_row(User.objects.create(username=f'{model}{number}'))
+                cache.clear()
+                self.assertEqual(self.changelist_queries(url), expected)
+
+    def test_post_remove_from_group(self):
+        """Действие убирает посты из группы и сверяет счётчик группы."""
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {
+                'action': 'remove_from_group',
+                ACTION_CHECKBOX_NAME: [post.pk for post in self.posts[:2]],
+            },
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertEqual(Post.objects.filter(group=self.group).count(), 3)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+
+    def test_post_fast_delete(self):
+        """Удаление постов чистит комментарии, ленты, картинки и счётчики."""
+        build_feed(self.reader.pk)
+        post = self.posts[0]
+        post.image = 'posts/deleted.gif'
+        post.save()
+        self.assertTrue(MediaFile.objects.filter(name=post.image).exists())
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {
+                'action': 'delete_fast',
+                ACTION_CHECKBOX_NAME: [post.pk for post in self.posts[:2]],
+            },
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        deleted = [post.pk for post in self.posts[:2]]
+        self.assertFalse(Post.objects.filter(pk__in=deleted).exists())
+        self.assertFalse(Comment.objects.filter(post__in=deleted).exists())
+        self.assertFalse(FeedItem.objects.filter(post__in=deleted).exists())
+        self.assertFalse(MediaFile.objects.filter(name=post.image).exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 3,
+        )
+
+    def test_comment_and_follow_fast_delete(self):
+        """Быстрое удаление сверяет счётчики после одного DELETE."""
+        self.client.post(
+            reverse('admin:posts_comment_changelist'),
+            {
+                'action': 'delete_fast',
+                ACTION_CHECKBOX_NAME: [self.comments[0].pk],
+            },
+        )
+        self.assertFalse(
+            Comment.objects.filter(pk=self.comments[0].pk).exists()
+        )
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].comments_count, 0)
+        self.client.post(
+            reverse('admin:posts_follow_changelist'),
+            {
+                'action': 'delete_fast',
+                ACTION_CHECKBOX_NAME: list(
+                    Follow.objects.values_list('pk', flat=True)
+                ),
+            },
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 0,
+        )
@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_other = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Другое описание',
+        )
+
+    def assertCounters(self, **expected):
+        for name, (obj, field, value) in expected.items():
+            obj.refresh_from_db()
+            with self.subTest(counter=name):
+                self.assertEqual(getattr(obj, field), value)
+
+    def test_post_counters(self):
+        """Посты двигают счётчики автора и групп."""
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group,
+        )
+        stats = UserStats.objects.get(user=self.author)
+        self.assertCounters(
+            author=(stats, 'posts_count', 1),
+            group=(self.group, 'posts_count', 1),
+        )
+        post.group = self.group_other
+        post.save()
+        self.assertCounters(
+            group=(self.group, 'posts_count', 0),
+            group_other=(self.group_other, 'posts_count', 1),
+        )
+        post.delete()
+        self.assertCounters(
+            author=(stats, 'posts_count', 0),
+            group_other=(self.group_other, 'posts_count', 0),
+        )
+
+    def test_comment_and_follow_counters(self):
+        """Комментарии и подписки двигают свои счётчики."""
+        post = Post.objects.create(text='Тестовый пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий',
+        )
+        self.assertCounters(post=(post, 'comments_count', 1))
+        post.save()
+        self.assertCounters(post=(post, 'comments_count', 1))
+        comment.delete()
+        self.assertCounters(post=(post, 'comments_count', 0))
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCounters(
+            followers=(self.author.stats, 'followers_count', 1),
+            following=(self.reader.stats, 'following_count', 1),
+        )
+
+    def test_post_delete_skips_comment_work(self):
+        """Каскадное удаление комментариев не трогает удаляемый пост."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.reader, text=f'Отзыв {number}')
+            for number in range(5)
+        ])
+        with CaptureQueriesContext(connection) as context:
+            post.delete()
+        self.assertFalse([
+            query['sql'] for query in context.captured_queries
+            if 'comments_count' in query['sql']
+        ])
+        self.assertFalse(Comment.objects.exists())
+        other = Post.objects.create(text='Другой', author=self.author)
+        comment = Comment.objects.create(
+            post=other, author=self.reader, text='Отзыв',
+        )
+        comment.delete()
+        self.assertCounters(comments=(other, 'comments_count', 0))
+
+    def test_reconcile_counters(self):
+        """reconcile_counters исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group,
+        )
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        Group.objects.filter(pk=self.group.pk).update(posts_count=0)
+        Post.objects.filter(pk=post.pk).update(comments_count=3)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(
+            author=(self.author.stats, 'posts_count', 1),
+            reader=(UserStats.objects.get(user=self.reader),
+                    'posts_count', 0),
+            group=(self.group, 'posts_count', 1),
+            post=(post, 'comments_count', 0),
+        )
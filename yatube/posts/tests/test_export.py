@@ -0,0 +1,77 @@
+import gzip
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.other = User.objects.create(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Пост автора', author=cls.author, group=cls.group,
+        )
+        Post.objects.create(text='Чужой пост', author=cls.other)
+        Comment.objects.create(
+            post=cls.post, author=cls.other, text='Комментарий',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_export_view(self):
+        """Автор выгружает свои посты с комментариями в gzip."""
+        url = reverse('posts:export_posts')
+        self.assertRedirects(
+            self.client.get(url), f'{reverse("users:login")}?next={url}',
+        )
+        self.client.force_login(self.author)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('Author-posts.jsonl.gz', response['Content-Disposition'])
+        lines = gzip.decompress(
+            b''.join(response.streaming_content)
+        ).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [(record['type'], record['text']) for record in records],
+            [('post', 'Пост автора'), ('comment', 'Комментарий')],
+        )
+
+    def test_export_command_round_trip(self):
+        """Выгрузку группы можно загрузить обратно через import_posts."""
+        path = os.path.join(TEMP_DIR, 'group.csv')
+        call_command(
+            'export_posts', group=self.group.slug, format='csv', output=path,
+        )
+        Post.objects.filter(group=self.group).delete()
+        call_command('import_posts', path, stdout=StringIO())
+        post = Post.objects.get(group=self.group)
+        self.assertEqual(
+            (post.pk, post.text, post.pub_date),
+            (self.post.pk, self.post.text, self.post.pub_date),
+        )
+        self.assertEqual(post.comments.get().text, 'Комментарий')
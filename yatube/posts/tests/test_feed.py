@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..feed import follow_posts
+from ..models import Feed, FeedItem, Follow, Post
+from ..utils import CursorPaginator
+
+User = get_user_model()
+
+
+@override_settings(FOLLOW_FEED_INBOX=True)
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.post = Post.objects.create(
+            text='Пост до подписки',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_build_feeds_command(self):
+        """build_feeds собирает ленту из существующих подписок."""
+        call_command('build_feeds', stdout=StringIO())
+        self.assertTrue(Feed.objects.filter(user=self.reader).exists())
+        self.assertTrue(
+            FeedItem.objects.filter(user=self.reader, post=self.post).exists()
+        )
+
+    def test_new_post_fans_out(self):
+        """Новый пост автора попадает в собранную ленту подписчика."""
+        call_command('build_feeds', stdout=StringIO())
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_follow_and_unfollow_update_feed(self):
+        """Подписка дополняет ленту, отписка очищает её."""
+        other = User.objects.create(username='Other')
+        other_post = Post.objects.create(text='Чужой пост', author=other)
+        call_command('build_feeds', stdout=StringIO())
+        Follow.objects.create(user=self.reader, author=other)
+        self.assertTrue(
+            FeedItem.objects.filter(user=self.reader, post=other_post).exists()
+        )
+        Follow.objects.filter(user=self.reader, author=other).delete()
+        self.assertFalse(
+            FeedItem.objects.filter(user=self.reader, post=other_post).exists()
+        )
+
+    def test_fallback_without_feed(self):
+        """Без собранной ленты посты берутся через подписки."""
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertFalse(Feed.objects.filter(user=self.reader).exists())
+        self.assertContains(response, self.post.text)
+
+    @override_settings(CURSOR_PAGINATION=True, PAGES=2)
+    def test_cursor_pages_over_feed(self):
+        """Курсор листает собранную ленту по ключу feed_items."""
+        posts = [self.post] + [
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+            for number in range(4)
+        ]
+        call_command('build_feeds', stdout=StringIO())
+        url = reverse('posts:follow_index')
+        seen, cursor = [], ''
+        while cursor is not None:
+            page = self.authorized_client.get(
+                url, {'cursor': cursor}).context['page_obj']
+            seen.extend(page)
+            cursor = page.next_cursor
+        self.assertEqual(seen, sorted(
+            posts, key=lambda post: (post.pub_date, post.pk), reverse=True,
+        ))
+        feed = follow_posts(self.reader)
+        self.assertEqual(
+            CursorPaginator(feed, 2).key, ('feed_date', 'feed_post'),
+        )
+        self.assertEqual(str(feed.query).count('posts_feeditem" ON'), 1)
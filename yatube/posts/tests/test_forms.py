@@ -1,4 +1,6 @@
+from hashlib import sha256
 from http import HTTPStatus
+from io import BytesIO
 import shutil
 import tempfile
 
@@ -7,6 +9,7 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..models import Group, Post, Comment
 
@@ -77,11 +80,13 @@ class PostFormTests(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.OK)
         self.assertEqual(Post.objects.count(), post_count + self.POST_QTY)
         post = Post.objects.latest('group')
+        with post.image.open('rb') as stored:
+            key = sha256(stored.read()).hexdigest()
         check_edited_post_fields = (
             (post.author, self.user),
             (post.text, form_data['text']),
             (post.group.id, form_data['group']),
-            (post.image, f'posts/{image}'),
+            (post.image, f'posts/{key[:2]}/{key[2:4]}/{key}.gif'),
         )
         for new_post, expected in check_edited_post_fields:
             with self.subTest(new_post=expected):
@@ -116,6 +121,50 @@ class PostFormTests(TestCase):
             with self.subTest(new_post=expected):
                 self.assertEqual(new_post, expected)
 
+    def jpeg_upload(self, size, orientation=None):
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile(
+            name='photo.jpg',
+            content=buffer.getvalue(),
+            content_type='image/jpeg',
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_create_form_normalizes_image(self):
+        """Картинка уменьшается, поворачивается по EXIF и теряет его."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Фото',
+                'image': self.jpeg_upload((300, 150), orientation=6),
+            },
+        )
+        post = Post.objects.get(text='Фото')
+        self.assertEqual((post.image_width, post.image_height), (50, 100))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertNotIn('exif', image.info)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100 * 100)
+    def test_create_form_rejects_huge_image(self):
+        """Слишком большая картинка отклоняется формой."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Огромное фото',
+                'image': self.jpeg_upload((200, 200)),
+            },
+        )
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка слишком большая: 200×200.',
+        )
+        self.assertFalse(Post.objects.filter(text='Огромное фото').exists())
+
     def test_comment_for_registered_users(self):
         """Комментарии могут оставлять зарегистрированные пользователи.
         + комментарий появляется на странице"""
@@ -0,0 +1,193 @@
+from io import StringIO
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+
+from ..models import MediaFile, Post
+from ..thumbnails import get_variant, prefetch_variants, variants
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class PostImageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='Author')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif',
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def thumbnail_files(self):
+        return [
+            name
+            for _, _, files in os.walk(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+            for name in files
+        ]
+
+    def test_generate_thumbnails_command(self):
+        """generate_thumbnails заранее создаёт миниатюры постов."""
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'), ignore_errors=True,
+        )
+        default.kvstore.clear()
+        out = StringIO()
+        call_command('generate_thumbnails', workers=0, stdout=out)
+        self.assertIn('Миниатюры созданы для постов: 1', out.getvalue())
+        self.assertEqual(
+            len(self.thumbnail_files()), len(list(variants())),
+        )
+        self.post.refresh_from_db()
+        self.assertTrue(
+            self.post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+
+    def test_prefetch_variants(self):
+        """Готовые миниатюры страницы читаются одним запросом."""
+        cache.clear()
+        for variant in variants():
+            get_variant(self.post.image, *variant)
+        cache.clear()
+        posts = [
+            Post.objects.get(pk=self.post.pk),
+            Post.objects.create(text='Без картинки', author=self.user),
+        ]
+        with self.assertNumQueries(1):
+            prefetch_variants(posts)
+        with self.assertNumQueries(0):
+            prefetch_variants(posts)
+        self.assertEqual(posts[1].thumbnails, {})
+        for variant in variants():
+            with self.subTest(variant=variant):
+                self.assertEqual(
+                    posts[0].thumbnails[variant].url,
+                    get_variant(self.post.image, *variant).url,
+                )
+
+    def test_render_does_not_generate_thumbnails(self):
+        """Без готовых миниатюр страница показывает оригинал сразу."""
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'), ignore_errors=True,
+        )
+        default.kvstore.clear()
+        cache.clear()
+        post = Post.objects.get(pk=self.post.pk)
+        html = Template('{% load post_images %}{% post_image post %}').render(
+            Context({'post': post}),
+        )
+        self.assertIn(f'src="{post.image.url}"', html)
+        self.assertIn('width="2" height="1"', html)
+        self.assertNotIn('srcset', html)
+        self.assertEqual(self.thumbnail_files(), [])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class MediaStorageTests(TestCase):
+    thumbnail_files = PostImageTests.thumbnail_files
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile(
+                name=name, content=SMALL_GIF, content_type='image/gif',
+            ),
+        )
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковые загрузки хранятся одним файлом с учётом ссылок."""
+        first = self.create_post()
+        second = self.create_post(name='copy.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}'
+            r'\.gif$',
+        )
+        media = MediaFile.objects.get(name=first.image.name)
+        self.assertEqual(media.refs, 2)
+        first.delete()
+        media.refresh_from_db()
+        self.assertEqual(media.refs, 1)
+        second.delete()
+        self.assertFalse(MediaFile.objects.filter(name=media.name).exists())
+
+    def test_gc_media_command(self):
+        """gc_media убирает картинки без постов и их миниатюры."""
+        live = self.create_post()
+        orphan = self.create_post(name='orphan.png')
+        orphan_name = orphan.image.name
+        for variant in variants():
+            get_variant(orphan.image, *variant)
+        Post.objects.filter(pk=orphan.pk).delete()
+        MediaFile.objects.all().delete()
+        stale = FileSystemStorage().save(
+            'cache/00/00/stale.jpg', ContentFile(b'x' * 10),
+        )
+        storage = live.image.storage
+        out = StringIO()
+        call_command('gc_media', min_age=0, dry_run=True, stdout=out)
+        self.assertIn(f'Лишний файл: {orphan_name}', out.getvalue())
+        self.assertTrue(storage.exists(orphan_name))
+        call_command('gc_media', min_age=0, stdout=StringIO())
+        self.assertTrue(storage.exists(live.image.name))
+        self.assertFalse(storage.exists(orphan_name))
+        self.assertFalse(storage.exists(stale))
+        self.assertEqual(self.thumbnail_files(), [])
+
+    def test_migrate_media_command(self):
+        """migrate_media переносит старые файлы в хранилище по хешу."""
+        post = self.create_post()
+        storage = post.image.storage
+        MediaFile.objects.all().delete()
+        old_name = FileSystemStorage().save(
+            'posts/old.gif', ContentFile(SMALL_GIF),
+        )
+        Post.objects.filter(pk=post.pk).update(image=old_name)
+        call_command('migrate_media', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(storage.is_hashed(post.image.name))
+        self.assertEqual(MediaFile.objects.get(name=post.image.name).refs, 1)
@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Follow, Group, MediaFile, Post, UserStats
+from .test_images import SMALL_GIF
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+RECORDS = [
+    {'type': 'post', 'id': 10, 'author': 'Old', 'group': 'history',
+     'text': 'Первый старый пост', 'pub_date': '2015-03-01T10:00:00'},
+    {'type': 'post', 'id': 11, 'author': 'Old',
+     'text': 'Второй старый пост', 'pub_date': '2016-03-01T10:00:00'},
+    {'type': 'comment', 'post': 10, 'author': 'Reader',
+     'text': 'Старый комментарий', 'created': '2015-03-02T10:00:00'},
+    {'type': 'comment', 'post': 999, 'author': 'Reader',
+     'text': 'Комментарий к посту, которого нет'},
+    {'type': 'follow', 'user': 'Reader', 'author': 'Old'},
+]
+
+
+@override_settings(MEDIA_ROOT=TEMP_DIR, THUMBNAIL_WORKERS=0)
+class ImportPostsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(TEMP_DIR, name)
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write(content)
+        return path
+
+    def test_import_jsonl(self):
+        """Импорт сохраняет даты и id, создаёт авторов и группы."""
+        path = self.write('dump.jsonl', '\n'.join(map(json.dumps, RECORDS)))
+        out = StringIO()
+        call_command('import_posts', path, batch_size=2, stdout=out)
+        self.assertIn('Пропущено записей без поста: 1', out.getvalue())
+        post = Post.objects.get(pk=10)
+        self.assertEqual(
+            post.pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc),
+        )
+        self.assertEqual(post.group, Group.objects.get(slug='history'))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().created.year, 2015)
+        old = User.objects.get(username='Old')
+        self.assertFalse(old.has_usable_password())
+        self.assertTrue(Follow.objects.filter(
+            user__username='Reader', author=old,
+        ).exists())
+        stats = UserStats.objects.get(user=old)
+        self.assertEqual((stats.posts_count, stats.followers_count), (2, 1))
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+    def test_import_resumes_from_checkpoint(self):
+        """Повторный запуск продолжает с контрольной точки."""
+        path = self.write(
+            'posts.csv',
+            'author,text,pub_date\n'
+            'Old,Уже импортирован,2015-01-01T00:00:00\n'
+            'Old,Новый,2015-01-02T00:00:00\n',
+        )
+        with open(f'{path}.checkpoint', 'w') as checkpoint:
+            json.dump({'done': 1}, checkpoint)
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Новый'],
+        )
+
+    def test_import_images(self):
+        """Картинки получают учёт ссылок, размеры и миниатюры."""
+        name = Post._meta.get_field('image').storage.save(
+            'posts/imported.gif', ContentFile(SMALL_GIF),
+        )
+        path = self.write('images.jsonl', '\n'.join(map(json.dumps, [
+            {'id': 20, 'author': 'Old', 'text': 'С картинкой', 'image': name},
+            {'id': 21, 'author': 'Old', 'text': 'Та же', 'image': name},
+        ])))
+        call_command('import_posts', path, stdout=StringIO())
+        # Повторный импорт тех же постов не добавляет ссылок.
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(MediaFile.objects.get(name=name).refs, 2)
+        post = Post.objects.get(pk=20)
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertTrue(post.image_placeholder.startswith('data:image/'))
+
+    def test_reimport_csv_images(self):
+        """Повторный импорт CSV с id не добавляет ссылок на картинку."""
+        name = Post._meta.get_field('image').storage.save(
+            'posts/imported.gif', ContentFile(SMALL_GIF),
+        )
+        path = self.write(
+            'images.csv',
+            f'id,author,text,image\n9001,Old,Из CSV,{name}\n',
+        )
+        call_command('import_posts', path, stdout=StringIO())
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.get().pk, 9001)
+        self.assertEqual(MediaFile.objects.get(name=name).refs, 1)
@@ -1,6 +1,9 @@
+from io import StringIO
+
 from ..models import Group, Post, Comment, CUT_TEXT
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
 User = get_user_model()
@@ -121,3 +124,9 @@ class PostModelTest(TestCase):
                     PostModelTest.comment._meta.get_field(field).help_text,
                     expected_value
                 )
+
+
+class QueryPlanTest(TestCase):
+    def test_view_queries_use_indexes(self):
+        """Запросы лент идут по индексам без временной сортировки."""
+        call_command('check_query_plans', stdout=StringIO())
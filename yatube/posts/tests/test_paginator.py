@@ -1,9 +1,12 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..models import Group, Post
+from ..utils import CachedCountPaginator
+from .on_commit import run_on_commit
 
 User = get_user_model()
 
@@ -53,3 +56,62 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(count_posts_second, page_float)
             else:
                 self.assertEqual(count_posts_second, settings.PAGES)
+
+    def test_cursor_paginator_correct(self):
+        """Курсорная пагинация обходит ленту без пропусков и повторов."""
+        url = reverse('posts:index')
+        cache.clear()
+        response = self.guest_client.get(f'{url}?cursor=')
+        first_page = list(response.context['page_obj'])
+        self.assertEqual(len(first_page), settings.PAGES)
+        self.assertFalse(response.context['page_obj'].has_previous())
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.guest_client.get(f'{url}?cursor={next_cursor}')
+        second_page = list(response.context['page_obj'])
+        self.assertEqual(
+            len(second_page), self.TEST_OF_POST - settings.PAGES
+        )
+        self.assertFalse(response.context['page_obj'].has_next())
+        self.assertEqual(
+            first_page + second_page,
+            list(Post.objects.order_by('-pub_date', '-pk')),
+        )
+        previous_cursor = response.context['page_obj'].previous_cursor
+        response = self.guest_client.get(f'{url}?cursor={previous_cursor}')
+        self.assertEqual(list(response.context['page_obj']), first_page)
+
+    def test_paginator_window_and_approximate_count(self):
+        """Окно номеров страниц и приблизительный подсчёт записей."""
+        posts = Post.objects.all()
+        paginator = CachedCountPaginator(posts, 1)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(7)),
+            [1, 2, '…', 4, 5, 6, 7, 8, 9, 10, '…', 12, 13],
+        )
+        with override_settings(PAGINATOR_COUNT_LIMIT=5):
+            cache.clear()
+            paginator = CachedCountPaginator(posts, 2)
+            self.assertEqual(paginator.count, 5)
+            self.assertTrue(paginator.approximate)
+            page = paginator.get_page(7)
+            self.assertEqual(len(page), 1)
+            self.assertFalse(page.has_next())
+        cache.clear()
+
+    @override_settings(PAGES=10)
+    def test_stale_count_does_not_hide_pages(self):
+        """Устаревший итог в кеше не прячет новые страницы."""
+        Post.objects.filter(pk__gt=Post.objects.order_by('pk')[9].pk).delete()
+        cache.clear()
+        self.guest_client.get(reverse('posts:index'))
+        with run_on_commit():
+            Post.objects.create(text='Одиннадцатый', author=self.user)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Следующая')
+        self.assertNotContains(response, 'Последняя')
+        response = self.guest_client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Тестовый текст 0'],
+        )
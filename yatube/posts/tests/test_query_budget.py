@@ -0,0 +1,24 @@
+from django.test import TestCase
+
+from ..urls import urlpatterns
+from .query_budget import QUERY_BUDGETS, Budget, QueryBudgetMixin
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    def test_every_url_has_budget(self):
+        """У каждого адреса posts.urls есть бюджет запросов."""
+        self.assertEqual(
+            {pattern.name for pattern in urlpatterns}, set(QUERY_BUDGETS),
+        )
+
+    def test_query_budgets(self):
+        """View укладываются в бюджет на данных любого размера."""
+        for name in QUERY_BUDGETS:
+            with self.subTest(name=name):
+                self.assertQueryBudget(name)
+
+    def test_report_shows_queries(self):
+        """Превышение бюджета перечисляет запросы view."""
+        self.budgets = {'index': Budget(1)}
+        with self.assertRaisesMessage(AssertionError, 'SELECT'):
+            self.assertQueryBudget('index')
@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from ..search import match_query, search_posts
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post_title = Post.objects.create(
+            text='Сирень цветёт, сирень пахнет', author=cls.author,
+        )
+        cls.post_once = Post.objects.create(
+            text='В саду растёт сирень и много чего ещё',
+            author=cls.reader,
+            group=cls.group,
+        )
+        cls.post_other = Post.objects.create(
+            text='Совсем другой пост', author=cls.author,
+        )
+
+    def found(self, text, queryset=None):
+        return list(search_posts(queryset or Post.objects.all(), text))
+
+    def test_match_query(self):
+        """Синтаксис FTS5 в запросе экранируется."""
+        self.assertEqual(match_query('сирень "OR" -сад*'),
+                         '"сирень"* "OR"* "сад"*')
+        self.assertEqual(match_query('  ()  '), '')
+
+    def test_ranked_by_bm25(self):
+        """Более релевантные посты идут первыми, лишние не находятся."""
+        self.assertEqual(
+            self.found('сирень'), [self.post_title, self.post_once],
+        )
+        self.assertEqual(self.found('сире'), self.found('сирень'))
+        self.assertEqual(self.found('()'), [])
+
+    def test_index_follows_changes(self):
+        """Индекс следует за постами и комментариями."""
+        comment = Comment.objects.create(
+            post=self.post_other, author=self.reader, text='Ландыши лучше',
+        )
+        self.assertEqual(self.found('ландыши'), [self.post_other])
+        comment.delete()
+        self.assertEqual(self.found('ландыши'), [])
+        self.post_other.text = 'Теперь про ландыши'
+        self.post_other.save()
+        self.assertEqual(self.found('ландыши'), [self.post_other])
+        self.post_other.delete()
+        self.assertEqual(self.found('ландыши'), [])
+
+    def test_comments_indexed_separately(self):
+        """Каждый комментарий - своя строка индекса, пост найден один раз."""
+        Comment.objects.bulk_create([
+            Comment(post=self.post_other, author=self.reader, text=text)
+            for text in ('Ромашки у реки', 'Ромашки и ландыши')
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM posts_comment_search WHERE post_id = %s',
+                [self.post_other.pk],
+            )
+            self.assertEqual(cursor.fetchone()[0], 2)
+        self.assertEqual(self.found('ромашки'), [self.post_other])
+        Comment.objects.filter(text__startswith='Ромашки и').update(
+            text='Только ландыши',
+        )
+        self.assertEqual(self.found('ромашки ландыши'), [])
+        self.assertEqual(self.found('ландыши'), [self.post_other])
+        Comment.objects.filter(text='Ромашки у реки').delete()
+        self.assertEqual(self.found('ромашки'), [])
+
+    @override_settings(PAGES=1)
+    def test_search_view_filters(self):
+        """Поиск фильтрует по группе и автору и листает с запросом."""
+        url = reverse('posts:search')
+        filters = (
+            ({'q': 'сирень'}, [self.post_title]),
+            ({'q': 'сирень', 'group': self.group.slug}, [self.post_once]),
+            ({'q': 'сирень', 'author': 'Reader'}, [self.post_once]),
+            ({'q': ''}, []),
+        )
+        for params, expected in filters:
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(
+                    list(response.context['page_obj']), expected,
+                )
+        response = self.client.get(url, {'q': 'сирень'})
+        self.assertContains(response, '?q=%D1%81%D0%B8%D1%80%D0%B5%D0%BD'
+                                      '%D1%8C&amp;page=2')
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по тому же индексу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password',
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'сирень'},
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.post_title, self.post_once},
+        )
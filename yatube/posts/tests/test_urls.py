@@ -46,6 +46,8 @@ class PostURLTests(TestCase):
              f'/posts/{cls.post.id}/comment/', HTTPStatus.FOUND, False),
             ('posts:follow_index', None, 'posts/follow.html',
              '/follow/', HTTPStatus.OK, False),
+            ('posts:search', None, 'posts/search.html',
+             '/search/', HTTPStatus.OK, True),
             ('posts:profile_follow', (cls.user,), None,
              f'/profile/{cls.user.username}/follow/',
              HTTPStatus.FOUND, False),
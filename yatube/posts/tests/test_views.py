@@ -2,14 +2,23 @@ import shutil
 import tempfile
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.core.cache import cache
+from django.db import transaction
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 
+from core.routers import replica_reads
+
 from ..forms import PostForm
-from ..models import Post, Group, Follow
+from ..cache import dependency_etag, dependency_versions
+from ..models import Comment, Post, Group, Follow
+from ..templatetags.post_cards import card_key
+from ..views import post_detail_etag
+from ..utils import attach_last_comments
+from .on_commit import run_on_commit
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -91,9 +100,9 @@ class PostViewsTests(TestCase):
     def test_index__group_profil_page_show_correct_context(self):
         """Шаблон index, group, profile сформирован с правильным контекстом."""
         revers = [
-            (reverse('posts:index'), None),
-            (reverse('posts:group_list', args=(self.group.slug,)), None),
-            (reverse('posts:profile', args=(self.user,)), None),
+            (reverse('posts:index'), True),
+            (reverse('posts:group_list', args=(self.group.slug,)), True),
+            (reverse('posts:profile', args=(self.user,)), True),
             (reverse('posts:post_detail', args=(self.post.id,)), False),
         ]
         for rever, bool in revers:
@@ -150,6 +159,175 @@ class PostViewsTests(TestCase):
         response_3 = self.client.get(reverse('posts:index'))
         self.assertNotEqual(response_1.content, response_3.content)
 
+    def test_cache_invalidated_by_dependencies(self):
+        """Кеш страниц сбрасывается записью в их зависимости."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user,)),
+        )
+        for url in urls:
+            self.client.get(url)
+        with run_on_commit():
+            post = Post.objects.create(
+                author=self.user,
+                text='Свежий пост',
+                group=self.group,
+            )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), post.text)
+        Post.objects.filter(pk=post.pk).update(text='Тихая правка')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), post.text)
+
+    def test_versions_bumped_after_commit(self):
+        """Версии зависимостей сдвигаются только после коммита записи."""
+        version, = dependency_versions(['feed'])
+        with run_on_commit():
+            with transaction.atomic():
+                Post.objects.create(author=self.user, text='В транзакции')
+                self.assertEqual(dependency_versions(['feed']), [version])
+            self.assertEqual(dependency_versions(['feed']), [version])
+        self.assertNotEqual(dependency_versions(['feed']), [version])
+
+    def test_follow_refreshes_both_profiles(self):
+        """Подписка сбрасывает кеш профилей автора и подписчика."""
+        follower_url = reverse('posts:profile', args=(self.user_no_author,))
+        author_url = reverse('posts:profile', args=(self.user,))
+        self.assertContains(self.client.get(follower_url), 'подписок: 0')
+        self.assertContains(self.client.get(author_url), 'Подписчиков: 0')
+        with run_on_commit():
+            follow = Follow.objects.create(
+                user=self.user_no_author, author=self.user,
+            )
+        self.assertContains(self.client.get(follower_url), 'подписок: 1')
+        self.assertContains(self.client.get(author_url), 'Подписчиков: 1')
+        with run_on_commit():
+            follow.delete()
+        self.assertContains(self.client.get(follower_url), 'подписок: 0')
+
+    def test_shared_page_body(self):
+        """Одно тело страницы в кеше, фрагменты у каждого пользователя."""
+        follower = Client()
+        follower.force_login(self.user_no_author)
+        follower.get(reverse('posts:profile_follow', args=(self.user,)))
+        url = reverse('posts:profile', args=(self.user,))
+        guest = self.client.get(url)
+        # Сессия, пользователь и подписка: тело страницы взято из кеша.
+        with self.assertNumQueries(3):
+            author = self.authorized_client.get(url)
+        self.assertContains(guest, 'Войти')
+        self.assertContains(guest, 'Подписаться')
+        self.assertContains(author, 'Пользователь: Author')
+        self.assertContains(author, 'Выгрузить посты')
+        self.assertContains(follower.get(url), 'Отписаться')
+        for response in (guest, author):
+            self.assertNotContains(response, '<!--fragment:')
+
+    def test_shared_page_not_found(self):
+        """Страница 404 общей ленты рендерится без меток фрагментов."""
+        response = self.client.get(
+            reverse('posts:group_list', args=('nope',)),
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertNotContains(response, '<!--fragment:', status_code=404)
+        self.assertContains(response, 'Войти', status_code=404)
+
+    def test_conditional_get(self):
+        """Совпавший ETag даёт 304 без основных запросов и рендеринга."""
+        urls = (
+            (reverse('posts:group_list', args=(self.group.slug,)), 0),
+            (reverse('posts:profile', args=(self.user,)), 0),
+            (reverse('posts:post_detail', args=(self.post.id,)), 1),
+        )
+        for url, queries in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertNotEqual(
+                    self.authorized_client.get(url)['ETag'], etag,
+                )
+                self.assertNotEqual(
+                    self.client.get(url + '?page=2')['ETag'], etag,
+                )
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_no_etag_from_replica(self):
+        """Страница, прочитанная с реплики, не получает ETag."""
+        request = RequestFactory().get('/')
+        request.user = self.user
+        etag_func = dependency_etag('feed', per_user=True)
+        self.assertIsNotNone(etag_func(request))
+        with replica_reads():
+            self.assertIsNone(etag_func(request))
+            self.assertIsNone(post_detail_etag(request, self.post.pk))
+
+    def test_conditional_get_changes_with_content(self):
+        """ETag меняется с постом, автором, группой и CSRF-cookie."""
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        etag = self.client.get(url)['ETag']
+        with run_on_commit():
+            Comment.objects.create(
+                post=self.post, author=self.user_no_author, text='Новый',
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новый')
+        etag = response['ETag']
+        with run_on_commit():
+            Post.objects.create(author=self.user, text='Ещё один пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.group.title = 'Новое название'
+        with run_on_commit():
+            self.group.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новое название')
+        etag = response['ETag']
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        missing = reverse('posts:post_detail', args=(self.post.id + 100,))
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_post_cards_cached(self):
+        """Карточка поста берётся из кеша, пока пост не изменился."""
+        context = Context({'posts': [self.post]})
+        template = Template(
+            '{% load post_cards %}{% post_cards posts as cards %}'
+            '{% for post, card in cards %}{{ card }}{% endfor %}'
+        )
+        self.assertIn(self.post.text, template.render(context))
+        version, = dependency_versions([f'post:{self.post.pk}'])
+        cache.set(card_key(self.post, True, version), 'из кеша')
+        self.assertEqual(template.render(context), 'из кеша')
+        self.post.text = 'Новый текст'
+        self.assertIn('Новый текст', template.render(context))
+
+    def test_feed_card_shows_last_comments(self):
+        """Карточка ленты показывает число и последние комментарии."""
+        for number in range(5):
+            Comment.objects.create(
+                post=self.post,
+                author=self.user_no_author,
+                text=f'Комментарий {number}',
+            )
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            attach_last_comments(posts)
+        self.assertEqual(
+            [comment.text for comment in posts[0].last_comments],
+            ['Комментарий 3', 'Комментарий 4'],
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 5')
+        self.assertContains(response, 'Комментарий 4')
+        self.assertNotContains(response, 'Комментарий 2')
+
     def test_users_can_follow_and_unfollow(self):
         """Зарегистрированный пользователь может подписаться и отписаться."""
         self.authorized_client.force_login(self.user_no_author)
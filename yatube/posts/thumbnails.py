@@ -0,0 +1,184 @@
+from base64 import b64encode
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import logging
+from multiprocessing import get_context
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _init_worker():
+    """Рабочий процесс запускается чистым и сам настраивает Django."""
+    import django
+    django.setup()
+
+
+def variants():
+    """Размеры и форматы миниатюр картинки поста: (ширина, высота, формат)."""
+    base_width, base_height = settings.POST_IMAGE_SIZE
+    for width in settings.POST_IMAGE_WIDTHS:
+        height = round(width * base_height / base_width)
+        for image_format in settings.POST_IMAGE_FORMATS:
+            yield width, height, image_format
+
+
+def get_variant(image, width, height, image_format):
+    """Миниатюра картинки в нужном размере и формате."""
+    # sorl импортируется здесь: модуль загружается рабочим процессом
+    # до django.setup().
+    from sorl.thumbnail import get_thumbnail
+
+    return get_thumbnail(
+        image,
+        f'{width}x{height}',
+        crop='center',
+        upscale=True,
+        format=image_format,
+    )
+
+
+def _thumbnail_options(image_format):
+    """Опции миниатюры, дополненные так же, как в get_thumbnail sorl."""
+    from sorl.thumbnail import default
+    from sorl.thumbnail.conf import defaults, settings as sorl_settings
+
+    options = {'crop': 'center', 'upscale': True, 'format': image_format}
+    for key, value in default.backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in default.backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def get_raw_many(keys):
+    """Записи хранилища sorl по ключам: кеш одним get_many, промахи - SQL."""
+    from sorl.thumbnail import default
+    from sorl.thumbnail.conf import settings as sorl_settings
+    from sorl.thumbnail.kvstores.cached_db_kvstore import (
+        EMPTY_VALUE, KVStore,
+    )
+    from sorl.thumbnail.models import KVStore as KVStoreModel
+
+    kvstore = default.kvstore
+    if not isinstance(kvstore, KVStore):
+        found = {key: kvstore._get_raw(key) for key in keys}
+        return {key: value for key, value in found.items() if value}
+    found = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        rows = dict(KVStoreModel.objects.filter(
+            key__in=missing,
+        ).values_list('key', 'value'))
+        kvstore.cache.set_many(rows, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        found.update(rows)
+    return {
+        key: value for key, value in found.items() if value != EMPTY_VALUE
+    }
+
+
+def prefetch_variants(posts):
+    """Находит готовые миниатюры картинок постов одним чтением хранилища.
+
+    Имена миниатюр вычисляются без обращения к файлам, записи sorl
+    читаются пакетом. Найденное кладётся в post.thumbnails по
+    (ширина, высота, формат), недостающее post_image создаст сам.
+    """
+    from sorl.thumbnail import default
+    from sorl.thumbnail.images import ImageFile, deserialize_image_file
+    from sorl.thumbnail.kvstores.base import add_prefix
+
+    options = {
+        image_format: _thumbnail_options(image_format)
+        for image_format in settings.POST_IMAGE_FORMATS
+    }
+    wanted = {}
+    for post in posts:
+        post.thumbnails = {}
+        if not post.image:
+            continue
+        source = ImageFile(post.image)
+        for width, height, image_format in variants():
+            name = default.backend._get_thumbnail_filename(
+                source, f'{width}x{height}', options[image_format],
+            )
+            key = add_prefix(ImageFile(name, default.storage).key)
+            wanted[key] = (post, (width, height, image_format))
+    for key, value in get_raw_many(list(wanted)).items():
+        post, variant = wanted[key]
+        post.thumbnails[variant] = deserialize_image_file(value)
+    return posts
+
+
+def make_placeholder(image):
+    """Крошечное размытое превью картинки в виде data: URI."""
+    width, height = settings.POST_IMAGE_PLACEHOLDER_SIZE
+    image.open('rb')
+    try:
+        with Image.open(image) as source:
+            preview = ImageOps.fit(source.convert('RGB'), (width, height))
+    finally:
+        image.close()
+    buffer = BytesIO()
+    preview.save(buffer, 'JPEG', quality=40)
+    return 'data:image/jpeg;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+def generate_for_post(post_id):
+    """Создаёт все миниатюры и превью-заглушку картинки поста."""
+    from .cache import bump, post_dependencies
+    from .models import Post
+
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id,
+    ).first()
+    if post is None or not post.image:
+        return 0
+    generated = 0
+    for variant in variants():
+        get_variant(post.image, *variant)
+        generated += 1
+    placeholder = make_placeholder(post.image)
+    if placeholder != post.image_placeholder:
+        Post.objects.filter(pk=post_id).update(image_placeholder=placeholder)
+        bump(*post_dependencies(post))
+    return generated
+
+
+def get_executor(workers=None):
+    """Пул процессов для миниатюр, общий для всего процесса Django."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=workers or settings.THUMBNAIL_WORKERS,
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error(
+            'Не удалось создать миниатюры',
+            exc_info=future.exception(),
+        )
+
+
+def schedule(post_id):
+    """Ставит создание миниатюр поста в фоновый пул.
+
+    При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу.
+    """
+    if not settings.THUMBNAIL_WORKERS:
+        generate_for_post(post_id)
+        return
+    get_executor().submit(generate_for_post, post_id).add_done_callback(
+        _log_failure
+    )
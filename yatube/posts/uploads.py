@@ -0,0 +1,75 @@
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.images import get_image_dimensions
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+# Форматы, в которых картинка остаётся после пересохранения,
+# остальные приводятся к JPEG.
+KEEP_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def save_options(image_format):
+    """Параметры сохранения: без EXIF и прочих метаданных."""
+    quality = settings.POST_IMAGE_QUALITY
+    return {
+        'JPEG': {'quality': quality, 'optimize': True, 'progressive': True},
+        'WEBP': {'quality': quality},
+        'PNG': {'optimize': True},
+    }.get(image_format, {})
+
+
+def normalize_image(upload):
+    """Приводит загруженную картинку поста к разумному размеру.
+
+    Размер читается из заголовка: слишком большие картинки отклоняются
+    до декодирования. Остальные поворачиваются по EXIF, уменьшаются до
+    POST_IMAGE_MAX_SIDE и пересохраняются без метаданных во временный
+    файл, который уходит на диск, когда перерастает
+    FILE_UPLOAD_MAX_MEMORY_SIZE. Анимированные картинки только проверяются.
+    """
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    with Image.open(upload) as image:
+        width, height = image.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Картинка слишком большая: %(width)s×%(height)s.',
+                code='image_too_large',
+                params={'width': width, 'height': height},
+            )
+        if getattr(image, 'is_animated', False):
+            upload.seek(0)
+            return upload
+        source_format = image.format
+        image_format = source_format
+        if image_format not in KEEP_FORMATS:
+            image_format = 'JPEG'
+        # JPEG умеет декодироваться сразу в уменьшенном масштабе.
+        image.draft(image.mode, (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    name = upload.name
+    if image_format != source_format:
+        name = f'{os.path.splitext(name)[0]}.{EXTENSIONS[image_format]}'
+    buffer = SpooledTemporaryFile(settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    image.save(buffer, image_format, **save_options(image_format))
+    size = buffer.tell()
+    buffer.seek(0)
+    return UploadedFile(buffer, name, Image.MIME[image_format], size)
+
+
+def image_dimensions(image):
+    """Ширина и высота картинки по заголовку файла."""
+    if not image:
+        return None, None
+    try:
+        return get_image_dimensions(image)
+    except OSError:
+        return None, None
@@ -14,6 +14,8 @@ urlpatterns = [
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('export/', views.export_posts, name='export_posts'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,9 +1,299 @@
+from hashlib import md5
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db.models import OuterRef, Q, Subquery
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .models import Comment, Post
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def batched(iterable, size):
+    """Делит поток значений на списки длиной не больше size."""
+    batch = []
+    for value in iterable:
+        batch.append(value)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def attach_last_comments(posts, count=None):
+    """Кладёт в post.last_comments последние комментарии каждого поста.
+
+    Все комментарии страницы выбираются одним запросом: для каждого
+    поста и каждой из count позиций скалярный подзапрос берёт один id
+    по индексу (post, created), так что тысячи комментариев к посту
+    не читаются. Число комментариев берётся из Post.comments_count.
+    """
+    count = count or settings.FEED_LAST_COMMENTS
+    by_post = {post.pk: post for post in posts if post.comments_count}
+    for post in posts:
+        post.last_comments = []
+    if not by_post:
+        return
+    latest = Comment.objects.filter(
+        post=OuterRef('pk'),
+    ).order_by('-created', '-id').values('id')
+    page_posts = Post.objects.filter(pk__in=list(by_post)).order_by()
+    ids = Q()
+    for offset in range(count):
+        ids |= Q(id__in=page_posts.annotate(
+            comment_id=Subquery(latest[offset:offset + 1]),
+        ).values('comment_id'))
+    for comment in Comment.objects.filter(ids).select_related('author'):
+        by_post[comment.post_id].last_comments.append(comment)
+
+
+def encode_cursor(direction, post):
+    """Кодирует позицию поста в ленте в непрозрачный токен.
+
+    Пост может быть и словарём из values() с ключами pub_date и pk.
+    """
+    if isinstance(post, dict):
+        pub_date, pk = post['pub_date'], post['pk']
+    else:
+        pub_date, pk = post.pub_date, post.pk
+    value = f'{direction}|{pub_date.isoformat()}|{pk}'
+    return urlsafe_base64_encode(value.encode())
+
+
+def decode_cursor(cursor):
+    """Разбирает токен курсора, для битого токена возвращает None."""
+    try:
+        direction, pub_date, pk = (
+            urlsafe_base64_decode(cursor).decode().split('|')
+        )
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage:
+    """Страница курсорной пагинации."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.next_cursor = None
+        self.previous_cursor = None
+        if object_list and has_next:
+            self.next_cursor = encode_cursor(NEXT, object_list[-1])
+        if object_list and has_previous:
+            self.previous_cursor = encode_cursor(PREVIOUS, object_list[0])
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинатор по ключу (pub_date, pk) без COUNT(*) и OFFSET.
+
+    Любая страница стоит столько же, сколько первая: выборка начинается
+    с позиции из курсора и читает per_page + 1 строк. Если queryset уже
+    упорядочен по двум полям с теми же значениями (feed_date, feed_post
+    у ленты подписок), ключом служат они, чтобы не терять индекс.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    @cached_property
+    def key(self):
+        ordering = getattr(self.object_list, 'query', None)
+        ordering = ordering.order_by if ordering is not None else ()
+        if len(ordering) == 2:
+            return tuple(field.lstrip('-') for field in ordering)
+        return ('pub_date', 'pk')
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor) if cursor else None
+        date, pk = self.key
+        posts = self.object_list
+        if position is None:
+            direction = NEXT
+            posts = posts.order_by(f'-{date}', f'-{pk}')
+        else:
+            direction, pub_date, post_id = position
+            if direction == NEXT:
+                posts = posts.filter(
+                    Q(**{f'{date}__lt': pub_date})
+                    | Q(**{date: pub_date, f'{pk}__lt': post_id})
+                ).order_by(f'-{date}', f'-{pk}')
+            else:
+                posts = posts.filter(
+                    Q(**{f'{date}__gt': pub_date})
+                    | Q(**{date: pub_date, f'{pk}__gt': post_id})
+                ).order_by(date, pk)
+        object_list = list(posts[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if direction == PREVIOUS:
+            object_list.reverse()
+            return CursorPage(object_list, True, has_more)
+        return CursorPage(object_list, has_more, position is not None)
+
+
+class WindowedPage(Page):
+    """Страница с окном номеров вместо полного page_range."""
+
+    has_more = False
+
+    def has_next(self):
+        return self.has_more
+
+    def next_page_number(self):
+        return self.number + 1
+
+    @property
+    def last_page_number(self):
+        """Номер последней страницы, если итог точен и не отстал."""
+        paginator = self.paginator
+        if paginator.approximate or paginator.num_pages <= self.number:
+            return None
+        return paginator.num_pages
+
+    @cached_property
+    def elided_page_range(self):
+        return list(self.paginator.get_elided_page_range(
+            self.number, self.has_more,
+        ))
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator с кешированным и, по желанию, приблизительным COUNT(*).
+
+    Число записей кешируется по подписи SQL-запроса на
+    PAGINATOR_COUNT_TIMEOUT секунд. Если задан PAGINATOR_COUNT_LIMIT,
+    записи считаются не дальше этой границы, а страницы за ней
+    открываются без знания точного итога.
+    """
+
+    ELLIPSIS = '…'
+    ON_EACH_SIDE = 3
+    ON_ENDS = 2
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return super().count
+        try:
+            sql = str(query)
+        except EmptyResultSet:
+            return 0
+        key = 'paginator_count:{}:{}'.format(
+            settings.PAGINATOR_COUNT_LIMIT,
+            md5(sql.encode()).hexdigest(),
+        )
+        count = cache.get(key)
+        if count is None:
+            count = self._count()
+            cache.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
+
+    def _count(self):
+        limit = settings.PAGINATOR_COUNT_LIMIT
+        if limit is None:
+            return self.object_list.count()
+        return self.object_list.order_by()[:limit].count()
+
+    @property
+    def approximate(self):
+        limit = settings.PAGINATOR_COUNT_LIMIT
+        return limit is not None and self.count >= limit
+
+    def validate_number(self, number):
+        # Итог из кеша может отставать: есть ли записи на странице за
+        # ним, решает page() по самой выборке.
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        """Страница выбирается по данным, а не по закешированному итогу.
+
+        Лишняя запись в выборке показывает, есть ли следующая страница,
+        поэтому устаревший COUNT(*) не обрезает и не теряет посты.
+        """
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage('Страница не содержит записей')
+        page = WindowedPage(object_list[:self.per_page], number, self)
+        page.has_more = len(object_list) > self.per_page
+        return page
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            return self.page(1)
+
+    def get_elided_page_range(self, number, has_more=False):
+        """Номера страниц вокруг текущей и по краям, с многоточиями."""
+        last = max(self.num_pages, number + has_more)
+        window = self.ON_EACH_SIDE + self.ON_ENDS
+        if last <= window * 2:
+            yield from range(1, last + 1)
+            return
+        if number > window + 1:
+            yield from range(1, self.ON_ENDS + 1)
+            yield self.ELLIPSIS
+            yield from range(number - self.ON_EACH_SIDE, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < last - window:
+            yield from range(number + 1, number + self.ON_EACH_SIDE + 1)
+            yield self.ELLIPSIS
+            yield from range(last - self.ON_ENDS + 1, last + 1)
+        else:
+            yield from range(number + 1, last + 1)
 
 
 def paginator(post_list, request):
-    """Пагинатор выводит 10 постов на страницу."""
-    paginator = Paginator(post_list, settings.PAGES)
+    """Пагинатор выводит 10 постов на страницу.
+
+    Курсорный режим включается параметром ?cursor= или настройкой
+    CURSOR_PAGINATION.
+    """
+    if settings.CURSOR_PAGINATION or 'cursor' in request.GET:
+        cursor_paginator = CursorPaginator(post_list, settings.PAGES)
+        return cursor_paginator.get_page(request.GET.get('cursor'))
+    paginator = CachedCountPaginator(post_list, settings.PAGES)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
@@ -1,13 +1,25 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-
-from .utils import paginator
+from django.views.decorators.http import condition
+
+from core.db import retry_on_locked
+from core.routers import using_replica
+
+from .cache import (
+    cache_page_with_deps, dependency_etag, dependency_versions,
+    versions_etag,
+)
+from .export import CONTENT_TYPES, export_stream
+from .feed import follow_posts
+from .search import search_posts
+from .utils import CachedCountPaginator, paginator
 from .forms import PostForm, CommentForm
 from .models import Post, Group, Follow, User
 
 
-@cache_page(60 * 20, key_prefix='index_page')
+@cache_page_with_deps('feed')
 def index(request):
     """Главная страница с записями."""
     post_list = Post.objects.select_related('author', 'group')
@@ -17,6 +29,8 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=dependency_etag('group:{slug}', per_user=True))
+@cache_page_with_deps('group:{slug}')
 def group_posts(request, slug):
     """Страница сообществ с записями."""
     group = get_object_or_404(Group, slug=slug)
@@ -28,25 +42,46 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=dependency_etag('author:{username}', per_user=True))
+@cache_page_with_deps('author:{username}')
 def profile(request, username):
     """Страница автора с его записями."""
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
     post_list = author.posts.select_related('group')
-    following = None
-    if request.user.is_authenticated:
-        following = author.following.filter(user=request.user).exists()
     context = {
         'page_obj': paginator(post_list, request),
         'author': author,
-        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def post_detail_etag(request, post_id):
+    """Валидатор страницы поста: версии поста, его автора и группы.
+
+    На странице есть число постов автора и название группы, поэтому
+    нужны и их версии; имена берутся одним запросом по первичному ключу.
+    """
+    # С реплики ETag не отдаётся (см. versions_etag): незачем и читать.
+    if using_replica():
+        return None
+    names = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug').first()
+    if names is None:
+        return None
+    username, slug = names
+    dependencies = [f'post:{post_id}', f'author:{username}']
+    if slug is not None:
+        dependencies.append(f'group:{slug}')
+    versions = dependency_versions(dependencies)
+    return versions_etag(request, versions, per_user=True)
+
+
+@condition(etag_func=post_detail_etag)
 def post_detail(request, post_id):
     """Страница одной записи."""
     post = get_object_or_404(
-        Post.objects.select_related('author', 'group'),
+        Post.objects.select_related('author__stats', 'group'),
         pk=post_id)
     comments = post.comments.select_related('author')
     context = {
@@ -58,6 +93,7 @@ def post_detail(request, post_id):
 
 
 @login_required
+@retry_on_locked
 def post_create(request):
     """Функция создания записи."""
     form = PostForm(
@@ -76,6 +112,7 @@ def post_create(request):
 
 
 @login_required
+@retry_on_locked
 def post_edit(request, post_id):
     """Функция редактирования записи."""
     post = get_object_or_404(
@@ -98,6 +135,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_locked
 def add_comment(request, post_id):
     """Функция создания комментариев."""
     post = get_object_or_404(
@@ -115,10 +153,7 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     """Функция страницы с подписками."""
-    posts = Post.objects.select_related('author', 'group').prefetch_related(
-        'comments').filter(
-        author__following__user=request.user
-    )
+    posts = follow_posts(request.user).select_related('author', 'group')
     context = {
         'page_obj': paginator(posts, request),
     }
@@ -126,6 +161,7 @@ def follow_index(request):
 
 
 @login_required
+@retry_on_locked
 def profile_follow(request, username):
     """Функция подписки на автора."""
     author = get_object_or_404(User, username=username)
@@ -136,9 +172,64 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_locked
 def profile_unfollow(request, username):
-    Follow.objects.filter(
+    # По одной подписке с её пользователями: сигнал удаления берёт
+    # их имена для сброса кеша без лишних запросов.
+    follows = Follow.objects.filter(
         user=request.user,
         author__username=username,
-    ).delete()
+    ).select_related('user', 'author')
+    for follow in follows:
+        follow.delete()
     return redirect('posts:profile', username)
+
+
+def search(request):
+    """Поиск по постам и комментариям с фильтрами по группе и автору."""
+    query = request.GET.get('q', '').strip()
+    group_slug = request.GET.get('group', '')
+    author = request.GET.get('author', '').strip()
+    posts = Post.objects.select_related('author', 'group')
+    if group_slug:
+        posts = posts.filter(group__slug=group_slug)
+    if author:
+        posts = posts.filter(author__username=author)
+    results = search_posts(posts, query)
+    # Курсор идёт по дате, а результаты упорядочены по релевантности.
+    page_obj = CachedCountPaginator(results, settings.PAGES).get_page(
+        request.GET.get('page')
+    )
+    params = request.GET.copy()
+    params.pop('page', None)
+    context = {
+        'query': query,
+        'group_slug': group_slug,
+        'author_name': author,
+        'groups': Group.objects.order_by('title'),
+        'page_obj': page_obj,
+        'page_query': params.urlencode() + '&' if params else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@login_required
+def export_posts(request):
+    """Выгрузка своих постов с комментариями в JSON Lines или CSV."""
+    file_format = request.GET.get('format')
+    if file_format not in CONTENT_TYPES:
+        file_format = 'jsonl'
+    compress = request.GET.get('gzip') != '0'
+    filename = f'{request.user.username}-posts.{file_format}'
+    content_type = CONTENT_TYPES[file_format]
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        export_stream(
+            Post.objects.filter(author=request.user), file_format, compress,
+        ),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
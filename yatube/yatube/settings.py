@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "posts.apps.PostsConfig",
     "users.apps.UsersConfig",
     "about.apps.AboutConfig",
+    "api.apps.ApiConfig",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -51,6 +52,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -92,6 +94,47 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# Профиль базы: production держит соединения открытыми и настраивает
+# SQLite под параллельную запись (WAL, ожидание блокировки, mmap).
+DATABASE_PROFILE = os.environ.get('YATUBE_DB_PROFILE', 'development')
+# PRAGMA для каждого нового соединения SQLite (core.db).
+SQLITE_PRAGMAS = {'busy_timeout': 5000}
+if DATABASE_PROFILE == 'production':
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        # Отрицательное значение - размер в КиБ, а не в страницах.
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    }
+# Изменяющие view с retry_on_locked повторяются при занятой базе:
+# не больше DATABASE_LOCK_ATTEMPTS раз, пауза от DATABASE_LOCK_DELAY
+# секунд и вдвое больше с каждой попыткой.
+DATABASE_LOCK_ATTEMPTS: int = 4
+DATABASE_LOCK_DELAY: float = 0.05
+# Файлы реплик только для чтения через запятую: они становятся
+# алиасами replica1, replica2... и обновляются командой replicate.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')), 1,
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+        # Файл реплики подменяется целиком, соединение не держим.
+        'CONN_MAX_AGE': 0,
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Насколько реплики могут отставать: столько секунд после записи
+# пользователь читает из default, и столько же живут страницы кеша,
+# собранные по данным реплики.
+REPLICA_PIN_SECONDS: int = 10
+REPLICA_PIN_COOKIE = 'primary_pin'
 
 
 # Password validation
@@ -138,13 +181,68 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 PAGES: int = 10
+# Курсорная пагинация по (pub_date, id) для всех лент.
+CURSOR_PAGINATION: bool = False
+# Сколько секунд хранить посчитанное число постов ленты.
+PAGINATOR_COUNT_TIMEOUT: int = 60
+# Считать посты не дальше этой границы (None - точный подсчёт).
+PAGINATOR_COUNT_LIMIT = None
+# Читать ленту подписок из материализованных лент (см. build_feeds).
+FOLLOW_FEED_INBOX: bool = False
+FEED_BATCH_SIZE: int = 1000
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Страницы лент сбрасываются по версиям зависимостей (posts.cache),
+# поэтому их можно держать в кеше часами.
+PAGE_CACHE_TIMEOUT: int = 60 * 60 * 6
+# Ключ карточки поста меняется вместе с её содержимым.
+POST_CARD_CACHE_TIMEOUT: int = 60 * 60 * 24
+# Сколько последних комментариев показывать в карточке ленты.
+FEED_LAST_COMMENTS: int = 2
+
+# Миниатюры картинок постов создаются фоновым пулом процессов сразу
+# после сохранения поста (0 - синхронно в текущем процессе).
+THUMBNAIL_WORKERS: int = 2
+# Картинка поста отдаётся в нескольких ширинах (srcset) с пропорциями
+# POST_IMAGE_SIZE, в WebP для браузеров, которые его понимают.
+POST_IMAGE_SIZE = (960, 339)
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = ('WEBP', 'JPEG')
+POST_IMAGE_PLACEHOLDER_SIZE = (16, 6)
+# Загрузки пишутся на диск кусками, а не собираются в памяти.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Картинки больше POST_IMAGE_MAX_PIXELS отклоняются по заголовку,
+# остальные уменьшаются до POST_IMAGE_MAX_SIDE по длинной стороне
+# и пересохраняются без метаданных.
+POST_IMAGE_MAX_PIXELS: int = 40_000_000
+POST_IMAGE_MAX_SIDE: int = 2048
+POST_IMAGE_QUALITY: int = 85
+
+# Выгрузка постов читает базу кусками по EXPORT_CHUNK_SIZE строк
+# и отдаёт ответ кусками примерно по EXPORT_BUFFER_SIZE байт.
+EXPORT_CHUNK_SIZE: int = 2000
+EXPORT_BUFFER_SIZE: int = 64 * 1024
+# Сколько постов можно запросить из API за один раз.
+API_BATCH_SIZE: int = 100
+
+# Кеш в файле SQLite общий для всех процессов сервера на машине:
+# сброс версии в одном воркере сразу виден остальным. Давно не
+# читанные записи вытесняются, когда значения занимают MAX_BYTES.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH', os.path.join(BASE_DIR, 'cache.sqlite3'),
+        ),
+        'OPTIONS': {
+            'MAX_BYTES': 256 * 1024 * 1024,
+        },
     }
 }
+# Тесты работают с кешем в памяти процесса (core.test_runner).
+TEST_RUNNER = 'core.test_runner.TestRunner'